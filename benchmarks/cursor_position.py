@@ -0,0 +1,116 @@
+"""
+micro-benchmark for the bottom bar's line:column reporting on a big note.
+
+InputArea.update_text_position runs on every cursor move (so every
+keystroke). compares it against the old version, which copied the whole
+text with toPlainText(), sliced it up to the cursor and split it on
+newlines. times both on their own and as part of a whole keystroke, with
+the cursor near the end of the note.
+
+    python benchmarks/cursor_position.py [megabytes]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6.QtCore import QEventLoop, QTimer
+from PySide6.QtGui import QTextCursor
+from PySide6.QtTest import QTest
+from PySide6.QtWidgets import QApplication
+
+from pages.note.note_area import InputArea
+
+
+def old_update_text_position(area):
+    """
+    update_text_position as it was before
+    """
+    cursor = area.input.textCursor()
+    pos = cursor.position()
+
+    text_before = area.input.toPlainText()[:pos]
+    lines = text_before.split("\n")
+
+    line_number = len(lines)
+    column_number = len(lines[-1])
+
+    area.updateBottomBar.emit("cursor", [line_number, column_number])
+
+
+def make_text(megabytes):
+    line = "the quick brown fox jumps over the lazy dog, again and again. " * 2
+    # each line is "<8 digit index> <line>\n"
+    count = megabytes * 1024 * 1024 // (len(line) + 10)
+    return "\n".join(f"{index:8} {line}" for index in range(count))
+
+
+def timed(function, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - started) * 1000 / repeat
+
+
+def main():
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    config = {"settings": {"relative_line_numbers": False, "font_size": 12}}
+    area = InputArea(config)
+    area.resize(1000, 700)
+    area.show()
+
+    text = make_text(megabytes)
+    area.input.setPlainText(text)
+
+    # near the end, where the old slice was the longest
+    cursor = area.input.textCursor()
+    cursor.movePosition(QTextCursor.MoveOperation.End)
+    cursor.movePosition(QTextCursor.MoveOperation.Up)
+    area.input.setTextCursor(cursor)
+
+    # let the editor finish laying the note out
+    loop = QEventLoop()
+    QTimer.singleShot(500, loop.quit)
+    loop.exec()
+
+    reported = []
+    area.updateBottomBar.connect(lambda name, value: reported.append(value))
+
+    old_update_text_position(area)
+    area.update_text_position()
+    assert reported[0] == reported[1], reported
+
+    def keystroke():
+        QTest.keyClicks(area.input, "x")
+        app.processEvents()
+
+    results = {
+        "handler": (
+            timed(lambda: old_update_text_position(area), 20),
+            timed(area.update_text_position, 20),
+        )
+    }
+
+    # a keystroke with only one of the two connected
+    def old_handler():
+        old_update_text_position(area)
+
+    area.input.cursorPositionChanged.disconnect(area.update_text_position)
+    area.input.cursorPositionChanged.connect(old_handler)
+    old_keystroke = timed(keystroke, 20)
+    area.input.cursorPositionChanged.disconnect(old_handler)
+    area.input.cursorPositionChanged.connect(area.update_text_position)
+    results["keystroke"] = (old_keystroke, timed(keystroke, 20))
+
+    print(f"{len(text) / 1024 / 1024:.1f} MB, {text.count(chr(10)) + 1} lines, ms each")
+    print(f"{'':12}{'old':>10}{'new':>10}{'speedup':>10}")
+    for name, (before, after) in results.items():
+        print(f"{name:12}{before:10.3f}{after:10.3f}{before / after:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
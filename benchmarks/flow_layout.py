@@ -0,0 +1,137 @@
+"""
+micro-benchmark for other/flow.py on 10k items.
+
+compares the cached FlowLayout against the old uncached pass, where every
+pass asks every item for its size hint (three times) and the style for the
+spacing (twice per item).
+
+only those lookups are cached. both versions still flow every item on every
+pass, relayout is not incremental, so the resize and append numbers are a
+full pass too.
+
+    python benchmarks/flow_layout.py [items]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6.QtCore import QPoint, QRect, Qt
+from PySide6.QtWidgets import QApplication, QSizePolicy, QWidget
+
+from other.flow import FlowLayout
+
+
+class UncachedFlowLayout(FlowLayout):
+    """
+    FlowLayout as it was before the caching
+    """
+
+    def _do_layout(self, rect, test_only):
+        x = rect.x()
+        y = rect.y()
+        line_height = 0
+        spacing = self.spacing()
+
+        for item in self._item_list:
+            style = item.widget().style()
+            layout_spacing_x = style.layoutSpacing(
+                QSizePolicy.ControlType.PushButton,
+                QSizePolicy.ControlType.PushButton,
+                Qt.Orientation.Horizontal,
+            )
+            layout_spacing_y = style.layoutSpacing(
+                QSizePolicy.ControlType.PushButton,
+                QSizePolicy.ControlType.PushButton,
+                Qt.Orientation.Vertical,
+            )
+            space_x = spacing + layout_spacing_x
+            space_y = spacing + layout_spacing_y
+            next_x = x + item.sizeHint().width() + space_x
+            if next_x - space_x > rect.right() and line_height > 0:
+                x = rect.x()
+                y = y + line_height + space_y
+                next_x = x + item.sizeHint().width() + space_x
+                line_height = 0
+
+            if not test_only:
+                item.setGeometry(QRect(QPoint(x, y), item.sizeHint()))
+
+            x = next_x
+            line_height = max(line_height, item.sizeHint().height())
+
+        return y + line_height - rect.y()
+
+
+def make_layout(layout_class, count):
+    parent = QWidget()
+    layout = layout_class(parent)
+    layout.setSpacing(25)
+    for _ in range(count):
+        item = QWidget()
+        item.setFixedSize(120, 60)
+        layout.addWidget(item)
+    return parent, layout
+
+
+def timed(function, repeat):
+    started = time.perf_counter()
+    for index in range(repeat):
+        function(index)
+    return (time.perf_counter() - started) * 1000 / repeat
+
+
+def bench(layout_class, count):
+    parent, layout = make_layout(layout_class, count)
+    rect = QRect(0, 0, 1600, 0)
+
+    def first(_):
+        layout.invalidate()
+        layout.heightForWidth(rect.width())
+        layout.setGeometry(rect)
+
+    # what a scroll or repaint costs: qt asks for the height, then places
+    def steady(_):
+        layout.heightForWidth(rect.width())
+        layout.setGeometry(rect)
+
+    def resize(index):
+        width = 1200 if index % 2 else 1600
+        layout.heightForWidth(width)
+        layout.setGeometry(QRect(0, 0, width, 0))
+
+    def append(_):
+        item = QWidget(parent)
+        item.setFixedSize(120, 60)
+        layout.addWidget(item)
+        layout.heightForWidth(rect.width())
+        layout.setGeometry(rect)
+
+    results = {
+        "first pass": timed(first, 1),
+        "steady pass": timed(steady, 20),
+        "resize pass": timed(resize, 10),
+    }
+    layout.setGeometry(rect)
+    results["append + pass"] = timed(append, 20)
+    return results
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    before = bench(UncachedFlowLayout, count)
+    after = bench(FlowLayout, count)
+
+    print(f"{count} items, ms per pass")
+    print(f"{'':16}{'uncached':>12}{'cached':>12}{'speedup':>10}")
+    for name in before:
+        speedup = before[name] / after[name] if after[name] else float("inf")
+        print(f"{name:16}{before[name]:12.2f}{after[name]:12.2f}{speedup:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
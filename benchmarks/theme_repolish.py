@@ -0,0 +1,212 @@
+"""
+measures what hovering costs the widgets in other/theme.py.
+
+compares them against the old way (a fresh setStyleSheet from every
+enterEvent / leaveEvent) while the mouse moves on and off each widget,
+counting the style change events qt sends, how many widgets get re-polished
+(through a proxy style under the stylesheet style) and timing it.
+
+    python benchmarks/theme_repolish.py [hovers]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6.QtCore import QEvent, QObject, QPoint
+from PySide6.QtGui import QIcon
+from PySide6.QtTest import QTest
+from PySide6.QtWidgets import (
+    QApplication, QFrame, QHBoxLayout, QProxyStyle, QWidget
+)
+
+from pages.home.home_page import NotePreview
+from pages.settings import SaveButton
+from widgets.make_note_prompt import MakeNotePrompt
+from widgets.top_bar import TopBar
+
+
+class OldNotePreview(NotePreview):
+    def set_hovered(self, hovered):
+        color = "#404040" if hovered else "#303030"
+        self.info_section.setStyleSheet(
+            f"""
+            background-color: {color};
+            color: white;
+            border-top-left-radius: 0px;
+            border-top-right-radius: 0px;
+            """
+        )
+
+
+# main.py can't be imported without starting the app, its side bar buttons
+# are the same as the top bar's now (only the old hover sheets differed)
+class OldSideBarButton(TopBar.IconButton):
+    def enterEvent(self, event):
+        self.setStyleSheet("background-color: #404040; border: none;")
+        return super().enterEvent(event)
+
+    def leaveEvent(self, event):
+        self.setStyleSheet("background-color: #303030; border: none;")
+        return super().leaveEvent(event)
+
+
+class OldTopBarButton(TopBar.IconButton):
+    def enterEvent(self, event):
+        self.setStyleSheet("background-color: #404040;")
+        return super().enterEvent(event)
+
+    def leaveEvent(self, event):
+        self.setStyleSheet("background-color: #303030;")
+        return super().leaveEvent(event)
+
+
+class OldSaveButton(SaveButton):
+    def change_ss(self, color):
+        self.setStyleSheet(
+            f"""
+            QPushButton{{
+                border: 1px solid white;
+                background-color: {color};
+                color: white;
+                border-radius: 10px;
+            }}
+            """
+        )
+
+    def enterEvent(self, event):
+        self.change_ss("#404040")
+        return super().enterEvent(event)
+
+    def leaveEvent(self, event):
+        self.change_ss("#303030")
+        return super().leaveEvent(event)
+
+
+class OldPromptButton(MakeNotePrompt.Button):
+    def set_stylesheet(self, color):
+        self.setStyleSheet(
+            f"""
+            QPushButton{{
+                background-color: #{color};
+                color: white;
+            }}
+            """
+        )
+
+    def enterEvent(self, event):
+        self.set_stylesheet("353535")
+        return super().enterEvent(event)
+
+    def leaveEvent(self, event):
+        self.set_stylesheet("303030")
+        return super().leaveEvent(event)
+
+
+class PolishCounter(QProxyStyle):
+    """
+    the stylesheet style polishes through the application style, so this
+    sees every widget that gets (re-)polished
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def polish(self, target):
+        if isinstance(target, QWidget):
+            self.count += 1
+        return super().polish(target)
+
+
+class StyleChangeCounter(QObject):
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Type.StyleChange:
+            self.count += 1
+        return False
+
+
+def make_widgets(old):
+    """
+    one of each hover-styled widget, (name, widget) pairs
+    """
+    return [
+        ("note card", (OldNotePreview if old else NotePreview)()),
+        ("side bar button", (OldSideBarButton if old else TopBar.IconButton)(QIcon())),
+        ("top bar button", (OldTopBarButton if old else TopBar.IconButton)(QIcon())),
+        ("save button", (OldSaveButton if old else SaveButton)()),
+        ("prompt button", (OldPromptButton if old else MakeNotePrompt.Button)("Create")),
+    ]
+
+
+def bench(old, hovers, changes, polishes):
+    window = QFrame()
+    layout = QHBoxLayout(window)
+    widgets = make_widgets(old)
+    for _, widget in widgets:
+        layout.addWidget(widget)
+    window.show()
+    QApplication.processEvents()
+
+    # somewhere on the window that isn't any of the widgets
+    outside = QPoint(window.width() - 1, window.height() - 1)
+
+    results = {}
+    for name, widget in widgets:
+        QTest.mouseMove(window, outside)
+        QApplication.processEvents()
+        changes.count = polishes.count = 0
+
+        started = time.perf_counter()
+        for _ in range(hovers):
+            QTest.mouseMove(widget, widget.rect().center())
+            QApplication.processEvents()
+            QTest.mouseMove(window, outside)
+            QApplication.processEvents()
+        elapsed = (time.perf_counter() - started) * 1000 / hovers
+
+        results[name] = (
+            changes.count / hovers,
+            polishes.count / hovers,
+            elapsed,
+        )
+
+    window.close()
+    window.deleteLater()
+    return results
+
+
+def main():
+    hovers = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    app = QApplication.instance() or QApplication(sys.argv)
+
+    polishes = PolishCounter()
+    app.setStyle(polishes)
+    changes = StyleChangeCounter()
+    app.installEventFilter(changes)
+
+    before = bench(True, hovers, changes, polishes)
+    after = bench(False, hovers, changes, polishes)
+
+    print(f"per hover (mouse on and off), averaged over {hovers}")
+    print(
+        f"{'':18}{'restyles old':>14}{'new':>6}"
+        f"{'polishes old':>14}{'new':>6}{'ms old':>9}{'new':>7}"
+    )
+    for name in before:
+        old_changes, old_polishes, old_ms = before[name]
+        changes, polishes, ms = after[name]
+        print(
+            f"{name:18}{old_changes:14.1f}{changes:6.1f}"
+            f"{old_polishes:14.1f}{polishes:6.1f}{old_ms:9.3f}{ms:7.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
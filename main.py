@@ -6,6 +6,8 @@ import qdarktheme
 import sys
 
 from other import file_management
+from other.icons import get_icon
+from other import theme
 from pages.home.home_page import HomePage
 from pages.note.note_page import NotePage
 from pages.settings import Settings
@@ -21,7 +23,7 @@ class MainWindow(QMainWindow):
 
         self.config = file_management.get_config()
         self.base_path = self.config["base_path"]
-        self.notes = self.config["notes"]
+        self.notes = file_management.get_notes_in_config()
 
         self.main_widget = QFrame(self)
         self.main_layout = QHBoxLayout(self.main_widget)
@@ -49,6 +51,9 @@ class MainWindow(QMainWindow):
 
         self.note_page = NotePage()
         self.note_page.backButton.connect(self.swap_home_page)
+        self.note_page.noteModified.connect(
+            self.home_page.note_container.mark_modified
+        )
         self.home_note_switcher.addSwitcher("note_page", self.note_page)
 
         self.main_switcher.addSwitcher("home_note", self.home_note_switcher)
@@ -68,8 +73,7 @@ class MainWindow(QMainWindow):
         self.main_switcher.switchTo("settings")
 
     def swap_home_page(self):
-        for note in self.home_page.note_container.notes:
-            note.redo_preview()
+        self.home_page.note_container.refresh_modified()
         self.side_bar.remove_spacer()
         self.home_note_switcher.switchTo("home_page")
 
@@ -129,23 +133,16 @@ class SideBar(QFrame):
         )
 
         self.home_button = self.IconButton(
-            QIcon("/home/zach/Desktop/icons/light_cottage.svg")
+            get_icon("light_cottage")
         )
 
         self.settings_button = self.IconButton(
-            QIcon("/home/zach/Desktop/icons/light_settings.svg")
+            get_icon("light_settings")
         )
 
         self.home_button.clicked.connect(self.home.emit)
         self.settings_button.clicked.connect(self.settings.emit)
 
-        for button in self.home_button, self.settings_button:
-            button.setStyleSheet(
-                """
-                border: none;
-                """
-            )
-
         self.main_layout.addWidget(self.home_button)
         self.second_layout.addWidget(self.settings_button)
         self.main_layout.addWidget(self.second_widget)
@@ -189,14 +186,7 @@ class SideBar(QFrame):
             self.setFixedSize(63, 63)
             self.setIcon(ico)
             self.setIconSize(QSize(32, 32))
-
-        def enterEvent(self, event: QEnterEvent, /) -> None:
-            self.setStyleSheet("background-color: #404040; border: none;")
-            return super().enterEvent(event)
-
-        def leaveEvent(self, event: QEvent, /) -> None:
-            self.setStyleSheet("background-color: #303030; border: none;")
-            return super().leaveEvent(event)
+            self.setStyleSheet(theme.ICON_BUTTON)
 
 
 class Switcher(QFrame):
@@ -261,6 +251,8 @@ class Switcher(QFrame):
 
 
 app = QApplication(sys.argv)
+# settings.json writes are batched, make sure the last one lands
+app.aboutToQuit.connect(file_management.flush_config)
 qdarktheme.load_stylesheet()
 w = MainWindow()
 w.show()
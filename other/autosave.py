@@ -0,0 +1,63 @@
+import hashlib
+from PySide6.QtCore import QObject, QTimer, Signal
+from PySide6.QtGui import QTextDocument
+
+"""
+autosaving for the open note.
+
+the document's modified flag is the dirty flag (qt clears it again if you
+undo back to the last save), and a save only gets asked for once the note
+has been left alone for a while. the hash is there so a save whose text
+matches what's already on disk can be skipped.
+"""
+
+# seconds of not typing before an autosave, if the settings don't say
+DEFAULT_DELAY = 5
+
+
+def content_hash(text: str) -> bytes:
+    return hashlib.blake2b(
+        text.encode("utf-8", errors="surrogatepass"), digest_size=16
+    ).digest()
+
+
+class AutosaveScheduler(QObject):
+
+    saveRequested = Signal()
+
+    def __init__(self, document: QTextDocument, delay: int, *args, **kwargs):
+        super().__init__(*args, *kwargs)
+
+        self.document = document
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.timed_out)
+
+        self.delay = 0
+        self.set_delay(delay)
+
+        # every edit pushes the save back, so it only happens once idle
+        self.document.contentsChanged.connect(self.restart)
+
+    def set_delay(self, delay: int) -> None:
+        """
+        seconds of idle time before saving, 0 turns autosaving off
+        """
+        self.delay = delay
+        if not self.delay:
+            self.timer.stop()
+
+    def restart(self) -> None:
+        if self.delay:
+            self.timer.start(self.delay * 1000)
+
+    def stop(self) -> None:
+        self.set_delay(0)
+
+    def is_dirty(self) -> bool:
+        return self.document.isModified()
+
+    def timed_out(self) -> None:
+        if self.is_dirty():
+            self.saveRequested.emit()
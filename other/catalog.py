@@ -0,0 +1,125 @@
+import sqlite3
+import threading
+
+"""
+sqlite backed storage for the note records (title, file, uuid, created,
+edited, type). it's an alternative to the "notes" array in settings.json,
+so mutations only touch one row instead of rewriting every note.
+
+nothing should really use this directly, file_management picks it when
+the config has "note_backend": "sqlite".
+"""
+
+FIELDS = ("uuid", "title", "file", "created", "edited", "type")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notes (
+    -- keeps the order notes were created in, which the home page shows
+    position INTEGER PRIMARY KEY AUTOINCREMENT,
+    uuid TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    file TEXT NOT NULL,
+    created TEXT NOT NULL,
+    edited TEXT NOT NULL,
+    type TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS notes_file ON notes (file);
+CREATE INDEX IF NOT EXISTS notes_title ON notes (title COLLATE NOCASE);
+"""
+
+
+class NoteCatalog:
+    def __init__(self, path: str):
+        self.path = path
+
+        # file_management can get called from more than one thread,
+        # so share the connection but only let one thread in at a time
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+    def _fetch(self, query: str, args: tuple = ()) -> list[dict]:
+        with self.lock:
+            rows = self.connection.execute(query, args).fetchall()
+        return [{field: row[field] for field in FIELDS} for row in rows]
+
+    def all_notes(self) -> list[dict]:
+        return self._fetch("SELECT * FROM notes ORDER BY position")
+
+    def get_by_uuid(self, uuid: str) -> dict:
+        rows = self._fetch("SELECT * FROM notes WHERE uuid = ?", (uuid,))
+        return rows[0] if rows else {}
+
+    def get_by_file(self, filename: str) -> dict:
+        rows = self._fetch(
+            "SELECT * FROM notes WHERE file = ? ORDER BY position DESC LIMIT 1",
+            (filename,),
+        )
+        return rows[0] if rows else {}
+
+    def get_by_title(self, prefix: str = "") -> list[dict]:
+        """
+        notes whose title starts with prefix (case insensitive), by title
+        """
+        escaped = (
+            prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        )
+        return self._fetch(
+            "SELECT * FROM notes WHERE title LIKE ? ESCAPE '\\' "
+            "ORDER BY title COLLATE NOCASE, uuid",
+            (f"{escaped}%",),
+        )
+
+    def add(self, note: dict) -> None:
+        self.add_many([note])
+
+    def add_many(self, notes: list[dict]) -> None:
+        """
+        inserts (or replaces, if the uuid is already there) a bunch of notes
+        in one transaction
+        """
+        with self.lock, self.connection:
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO notes ({', '.join(FIELDS)}) "
+                f"VALUES ({', '.join('?' * len(FIELDS))})",
+                [tuple(note[field] for field in FIELDS) for note in notes],
+            )
+
+    def remove(self, uuid: str) -> dict:
+        note = self.get_by_uuid(uuid)
+        if note:
+            with self.lock, self.connection:
+                self.connection.execute("DELETE FROM notes WHERE uuid = ?", (uuid,))
+        return note
+
+    def update(self, uuid: str, **fields) -> dict:
+        fields = {key: value for key, value in fields.items() if key in FIELDS}
+        if fields:
+            with self.lock, self.connection:
+                self.connection.execute(
+                    f"UPDATE notes SET {', '.join(f'{key} = ?' for key in fields)} "
+                    "WHERE uuid = ?",
+                    (*fields.values(), uuid),
+                )
+        return self.get_by_uuid(fields.get("uuid", uuid))
+
+    def count(self) -> int:
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+
+
+if __name__ == "__main__":
+    # one-shot migration of the notes array in settings.json into sqlite
+    from other import file_management
+
+    moved = file_management.migrate_to_catalog()
+    print(f"moved {moved} notes into {file_management.get_catalog_path()}")
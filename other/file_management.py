@@ -1,4 +1,13 @@
+import atexit
+import bisect
+import codecs
 import json
+import os
+import tempfile
+import threading
+
+from other import front_matter
+from other import layout
 
 """
 i completely forgot that this was even a thing but i thing
@@ -7,32 +16,346 @@ some things somewhere depend on it so i'll keep it in i guess
 
 base_path = "/home/zach/Desktop/college/programming/python/mkdown/files"
 
+# the parsed settings.json is kept around here so that every helper shares
+# the same dictionary instead of re-parsing the file on every call.
+# it only gets re-read when the file's mtime or size changes on disk.
+_config_cache = {
+    "config": None,
+    "mtime": None,
+    "size": None,
+}
+_config_stats = {
+    "hits": 0,
+    "misses": 0,
+}
+
+# write_json() doesn't touch the disk right away. it parks the config here
+# and a timer writes it out after write_delay seconds, so a burst of saves
+# turns into one write.
+write_delay = 0.5
+
+_pending_write = {
+    "config": None,
+    "timer": None,
+    # the config flush_config() is writing right now. settings.json can't
+    # be trusted until it's done, it may still have an older write in it.
+    "writing": None,
+}
+_pending_lock = threading.Lock()
+_flush_lock = threading.Lock()
+
+# saves update notes from the io threads and the journal worker, while the gui
+# adds and removes them, so the cached config and the lookup tables below
+# only change (and get read) while holding this. it's taken before
+# _pending_lock, never after.
+_notes_lock = threading.RLock()
+
+# lookup tables over config["notes"]. they get rebuilt whenever the config
+# dictionary itself is replaced (settings.json was re-read), and are kept up
+# to date by add_note / remove_note / update_note otherwise.
+_note_index = {
+    "config": None,
+    "by_uuid": {},
+    "by_file": {},
+    # sorted (casefolded title, uuid) pairs
+    "titles": [],
+}
+
+# the front matter header scanner, only used with "note_backend": "frontmatter"
+_scanner = {
+    "scanner": None,
+}
+
+# the sqlite note catalog, opened the first time it's needed
+# (only when the config has "note_backend": "sqlite")
+_catalog = {
+    "catalog": None,
+    "path": None,
+}
+
+# home page previews only show the top of a note, so only the top gets read
+SNIPPET_BYTES = 2048
+SNIPPET_LINES = 8
+SNIPPET_LINE_LENGTH = 64
+
+
+def get_config_path() -> str:
+    return f"{base_path}/settings.json"
+
 
 def get_config() -> dict:
-    with open(f"{base_path}/settings.json", "r") as f:
-        return json.load(f)
+    with _notes_lock:
+        # a write that hasn't hit the disk yet is newer than whatever is there
+        with _pending_lock:
+            for key in ("config", "writing"):
+                if _pending_write[key] is not None:
+                    _config_stats["hits"] += 1
+                    return _pending_write[key]
+
+        stat = os.stat(get_config_path())
+
+        if (
+            _config_cache["config"] is not None
+            and _config_cache["mtime"] == stat.st_mtime_ns
+            and _config_cache["size"] == stat.st_size
+        ):
+            _config_stats["hits"] += 1
+            return _config_cache["config"]
+
+        _config_stats["misses"] += 1
+        with open(get_config_path(), "r") as f:
+            config = json.load(f)
+            # stat the handle we actually read, in case the file changed
+            # between the first stat and the open
+            _remember_config(config, os.fstat(f.fileno()))
+
+        return config
+
+def _remember_config(config: dict, stat: os.stat_result) -> None:
+    _config_cache["config"] = config
+    _config_cache["mtime"] = stat.st_mtime_ns
+    _config_cache["size"] = stat.st_size
+
+def invalidate_config() -> None:
+    """
+    forgets the cached config, so the next get_config() reads the file again
+    """
+    with _notes_lock:
+        _config_cache["config"] = None
+        _config_cache["mtime"] = None
+        _config_cache["size"] = None
+
+def get_config_stats() -> dict:
+    """
+    returns how many get_config() calls were served from the cache (hits)
+    and how many had to read settings.json (misses)
+    """
+    return dict(_config_stats)
 
 def write_json(dictionary: dict) -> None:
-    with open(f"{base_path}/settings.json", "w") as f:
-        f.write(json.dumps(dictionary, indent=4))
+    """
+    queues the config to be written to settings.json. everything written
+    within write_delay seconds gets merged into a single write.
+    use flush_config() if it has to be on disk right now.
+    """
+    with _pending_lock:
+        _pending_write["config"] = dictionary
+        _config_cache["config"] = dictionary
+
+        if _pending_write["timer"] is None:
+            timer = threading.Timer(write_delay, flush_config)
+            timer.daemon = True
+            _pending_write["timer"] = timer
+            timer.start()
+
+def flush_config() -> None:
+    """
+    writes the queued config (if there is one) to settings.json.
+    it goes to a temp file first, gets fsynced, and then replaces the real
+    file, so a crash halfway through never leaves a half written config.
+    """
+    with _flush_lock:
+        with _pending_lock:
+            config = _pending_write["config"]
+            timer = _pending_write["timer"]
+            _pending_write["config"] = None
+            _pending_write["timer"] = None
+
+            if config is None:
+                return
+            _pending_write["writing"] = config
+
+            # the gui thread can keep changing the dict while we write it,
+            # so take a snapshot. the compact dumps goes through the c
+            # encoder, which doesn't let other threads in halfway through.
+            snapshot = json.loads(json.dumps(config))
+
+        if timer is not None and timer is not threading.current_thread():
+            timer.cancel()
+
+        try:
+            _atomic_write(get_config_path(), json.dumps(snapshot, indent=4))
+        except OSError:
+            # put it back so the next flush (or exit) tries again,
+            # unless something newer got queued in the meantime
+            with _pending_lock:
+                if _pending_write["config"] is None:
+                    _pending_write["config"] = config
+                _pending_write["writing"] = None
+            raise
+
+        with _pending_lock:
+            if _pending_write["config"] is None and _config_cache["config"] is config:
+                _remember_config(config, os.stat(get_config_path()))
+            _pending_write["writing"] = None
+
+def _atomic_write(path: str, contents: str) -> None:
+    directory = os.path.dirname(path) or "."
+    fd, temp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(contents)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+    # make the rename itself durable
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+def get_layout() -> str:
+    """
+    how note files are laid out under the base path, see other/layout.py
+    """
+    return get_config().get("layout", layout.FLAT)
+
+def get_file_path(filename: str) -> str:
+    """
+    the full path of a note file, wherever the layout puts it
+    """
+    note_layout = get_layout()
+    if note_layout == layout.FLAT:
+        return f"{get_base_path()}/{filename}"
+
+    note = get_note_by_file(filename)
+    return layout.note_path(
+        get_base_path(), note_layout, note.get("uuid", ""), filename
+    )
+
+def get_note_file_path(note: dict) -> str:
+    """
+    the full path of a note's file, worked out from the note itself, so it
+    still works once the note has been removed from the config
+    """
+    return layout.note_path(get_base_path(), get_layout(), note["uuid"], note["file"])
+
+def _make_parent(path: str) -> None:
+    if get_layout() != layout.FLAT:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
 
 def create_file(filename: str) -> None:
-    path = get_base_path()
-    with open(f"{path}/{filename}", "w") as f:
-        f.write("")
+    contents = ""
+    if _note_backend() == "frontmatter":
+        # the metadata lives in the file, so it can't start out empty
+        contents = front_matter.render(get_note_by_file(filename))
+
+    path = get_file_path(filename)
+    _make_parent(path)
+    with open(path, "w") as f:
+        f.write(contents)
+
+    if _note_backend() == "frontmatter":
+        get_scanner().remember(get_base_path(), get_note_by_file(filename))
+
+def delete_file(note: dict) -> None:
+    """
+    deletes a note's file and its companion files (see other/layout.py)
+    """
+    path = get_note_file_path(note)
+    for companion in layout.companion_paths(path):
+        try:
+            os.remove(companion)
+        except FileNotFoundError:
+            pass
+
+    os.remove(path)
 
 def get_text_in_file(filename: str) -> str:
-    path = get_base_path()
-    with open(f"{path}/{filename}", "r") as f:
-        return f.read()
+    with open(get_file_path(filename), "r") as f:
+        text = f.read()
 
-def write_to_file(filename: str, contents: str) -> None:
-    path = get_base_path()
-    with open(f"{path}/{filename}", "w") as f:
-        f.write(contents)
+    if _note_backend() == "frontmatter":
+        return front_matter.split(text)[1]
 
-def get_notes_in_config() -> dict:
-    return get_config()["notes"]
+    return text
+
+def make_snippet(text: str) -> str:
+    """
+    cuts text down to what fits on a home page card
+    """
+    lines = text.split("\n", SNIPPET_LINES)[:SNIPPET_LINES]
+    return "\n".join(line[:SNIPPET_LINE_LENGTH] for line in lines)
+
+def get_snippet(filename: str, max_bytes: int = SNIPPET_BYTES) -> str:
+    """
+    the start of a note for its preview, without reading the whole file
+    """
+    frontmatter = _note_backend() == "frontmatter"
+    if frontmatter:
+        max_bytes += front_matter.MAX_HEADER_BYTES
+
+    with open(get_file_path(filename), "rb") as f:
+        head = f.read(max_bytes)
+
+    # not final, so a character cut in half at the end gets dropped
+    # instead of turning into garbage
+    text = codecs.getincrementaldecoder("utf-8")(errors="replace").decode(head)
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+
+    if frontmatter:
+        text = front_matter.split(text)[1]
+
+    return make_snippet(text)
+
+def write_to_file(filename: str, contents: str, atomic: bool = False) -> None:
+    """
+    writes contents to a note file. with atomic, it goes through a temp
+    file so the old contents stay intact if something dies halfway.
+    """
+    note = {}
+    if _note_backend() == "frontmatter":
+        note = get_note_by_file(filename)
+        if note:
+            contents = front_matter.render(note) + contents
+
+    if atomic:
+        _atomic_write(get_file_path(filename), contents)
+    else:
+        with open(get_file_path(filename), "w") as f:
+            f.write(contents)
+
+    if note:
+        get_scanner().remember(get_base_path(), note)
+
+def save_note(uuid: str, contents: str, edited: str) -> dict:
+    """
+    writes the contents of a note and bumps its edited date.
+    returns the note, or {} if there's no note with that uuid.
+    """
+    note = get_note_by_uuid(uuid)
+    if not note:
+        return {}
+
+    if _note_backend() == "frontmatter":
+        # the date is part of the header, so one write covers both
+        note["edited"] = edited
+        write_to_file(note["file"], contents)
+        return note
+
+    write_to_file(note["file"], contents)
+    return update_note(uuid, edited=edited)
+
+def get_notes_in_config() -> list:
+    if _note_backend() == "sqlite":
+        return get_catalog().all_notes()
+    if _note_backend() == "frontmatter":
+        return get_scanner().scan(get_base_path())
+
+    # a copy, the list changes under other threads
+    with _notes_lock:
+        return list(get_config()["notes"])
 
 
 def get_base_path() -> str:
@@ -42,11 +365,320 @@ def get_base_path() -> str:
 def get_settings():
     return get_config()["settings"]
 
-def get_note_by_uuid(uuid: str) -> dict:
+def get_catalog_path() -> str:
+    return f"{base_path}/.notewriter/catalog.sqlite3"
+
+def get_preview_cache_path() -> str:
+    return f"{base_path}/.notewriter/previews.json"
+
+def get_catalog():
+    """
+    returns the sqlite note catalog for the current base path
+    """
+    from other.catalog import NoteCatalog
+
+    path = get_catalog_path()
+    if _catalog["catalog"] is None or _catalog["path"] != path:
+        close_catalog()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _catalog["catalog"] = NoteCatalog(path)
+        _catalog["path"] = path
+
+    return _catalog["catalog"]
+
+def close_catalog() -> None:
+    if _catalog["catalog"] is not None:
+        _catalog["catalog"].close()
+        _catalog["catalog"] = None
+        _catalog["path"] = None
+
+def get_scanner():
+    """
+    returns the front matter header scanner
+    """
+    note_layout = get_layout()
+    if _scanner["scanner"] is None or _scanner["scanner"].layout != note_layout:
+        _scanner["scanner"] = front_matter.HeaderScanner(note_layout)
+
+    return _scanner["scanner"]
+
+def _note_backend() -> str:
+    """
+    where the note records live: "json" (the notes array in settings.json),
+    "sqlite" (the catalog) or "frontmatter" (a header in each note file)
+    """
+    return get_config().get("note_backend", "json")
+
+def migrate_to_catalog() -> int:
+    """
+    moves the notes array out of settings.json and into the sqlite catalog,
+    then switches the config over to it. running it again is harmless.
+    returns how many notes were moved.
+    """
+    config = get_config()
+    notes = config.get("notes", [])
+
+    # the catalog has to have everything before the json lets go of it
+    get_catalog().add_many(notes)
+
+    config["note_backend"] = "sqlite"
+    config["notes"] = []
+    write_json(config)
+    flush_config()
+
+    return len(notes)
+
+def migrate_to_front_matter() -> int:
+    """
+    writes every note's metadata into a header at the top of its file,
+    then switches the config over to reading the headers. running it again
+    is harmless, files that already have their header are left alone and
+    notes whose file is missing are skipped.
+    returns how many notes were moved.
+    """
+    config = get_config()
+    if _note_backend() == "frontmatter":
+        return 0
+
+    moved = 0
+    for note in get_notes_in_config():
+        path = get_file_path(note["file"])
+        try:
+            # converted by an earlier run that didn't get to the end
+            if front_matter.read_header(path).get("uuid") == note["uuid"]:
+                continue
+            text = get_text_in_file(note["file"])
+        except FileNotFoundError:
+            continue
+
+        _atomic_write(path, front_matter.render(note) + text)
+        moved += 1
+
+    config["note_backend"] = "frontmatter"
+    config["notes"] = []
+    write_json(config)
+    flush_config()
+
+    get_scanner().reset()
+    return moved
+
+def migrate_layout(to_layout: str) -> int:
+    """
+    moves every note file into a different layout (see other/layout.py)
+    and switches the config over to it. returns how many files were moved.
+    """
+    config = get_config()
     notes = get_notes_in_config()
 
-    for note in notes:
-        if uuid == note['uuid']:
-            return note
-    else:
+    moved = layout.migrate(get_base_path(), notes, get_layout(), to_layout)
+
+    config["layout"] = to_layout
+    write_json(config)
+    flush_config()
+
+    return moved
+
+def _unique_filename(note: dict) -> str:
+    stem, extension = os.path.splitext(note["file"])
+
+    def taken(filename):
+        path = layout.note_path(get_base_path(), get_layout(), note["uuid"], filename)
+        return get_note_by_file(filename) or os.path.exists(path)
+
+    candidate = note["file"]
+    number = 2
+    while taken(candidate):
+        candidate = f"{stem}_{number}{extension}"
+        number += 1
+
+    return candidate
+
+def _get_index() -> dict:
+    """
+    call with _notes_lock held, for as long as the index is being used
+    """
+    config = get_config()
+    if _note_index["config"] is not config:
+        _build_index(config)
+    return _note_index
+
+def _build_index(config: dict) -> None:
+    _note_index["config"] = config
+    _note_index["by_uuid"] = {note["uuid"]: note for note in config["notes"]}
+    _note_index["by_file"] = {note["file"]: note for note in config["notes"]}
+    _note_index["titles"] = sorted(
+        (note["title"].casefold(), note["uuid"]) for note in config["notes"]
+    )
+
+def _index_note(index: dict, note: dict) -> None:
+    index["by_uuid"][note["uuid"]] = note
+    index["by_file"][note["file"]] = note
+    bisect.insort(index["titles"], (note["title"].casefold(), note["uuid"]))
+
+def _unindex_note(index: dict, note: dict) -> None:
+    index["by_uuid"].pop(note["uuid"], None)
+    if index["by_file"].get(note["file"]) is note:
+        index["by_file"].pop(note["file"])
+
+    key = (note["title"].casefold(), note["uuid"])
+    titles = index["titles"]
+    i = bisect.bisect_left(titles, key)
+    if i < len(titles) and titles[i] == key:
+        titles.pop(i)
+
+def get_note_by_uuid(uuid: str) -> dict:
+    if _note_backend() == "sqlite":
+        return get_catalog().get_by_uuid(uuid)
+    if _note_backend() == "frontmatter":
+        return get_scanner().get(get_base_path(), uuid=uuid)
+
+    with _notes_lock:
+        return _get_index()["by_uuid"].get(uuid, {})
+
+def get_note_by_file(filename: str) -> dict:
+    if _note_backend() == "sqlite":
+        return get_catalog().get_by_file(filename)
+    if _note_backend() == "frontmatter":
+        return get_scanner().get(get_base_path(), filename=filename)
+
+    with _notes_lock:
+        return _get_index()["by_file"].get(filename, {})
+
+def get_notes_by_title(prefix: str = "") -> list[dict]:
+    """
+    returns the notes whose title starts with prefix (case insensitive),
+    sorted by title. an empty prefix gives back every note.
+    """
+    if _note_backend() == "sqlite":
+        return get_catalog().get_by_title(prefix)
+    if _note_backend() == "frontmatter":
+        prefix = prefix.casefold()
+        return sorted(
+            (
+                note
+                for note in get_notes_in_config()
+                if note["title"].casefold().startswith(prefix)
+            ),
+            key=lambda note: (note["title"].casefold(), note["uuid"]),
+        )
+
+    prefix = prefix.casefold()
+
+    notes = []
+    with _notes_lock:
+        index = _get_index()
+        titles = index["titles"]
+        for title, uuid in titles[bisect.bisect_left(titles, (prefix, "")):]:
+            if not title.startswith(prefix):
+                break
+            notes.append(index["by_uuid"][uuid])
+
+    return notes
+
+def add_note(note: dict) -> None:
+    """
+    adds a note to the config and the indexes, then writes the config.
+    if another note already uses the same file name, note["file"] gets
+    a number added to it.
+    """
+    note["file"] = _unique_filename(note)
+
+    if _note_backend() == "sqlite":
+        get_catalog().add(note)
+        return
+    if _note_backend() == "frontmatter":
+        path = layout.note_path(
+            get_base_path(), get_layout(), note["uuid"], note["file"]
+        )
+        _make_parent(path)
+        with open(path, "w") as f:
+            f.write(front_matter.render(note))
+        get_scanner().remember(get_base_path(), note)
+        return
+
+    with _notes_lock:
+        index = _get_index()
+        config = index["config"]
+
+        config["notes"].append(note)
+        _index_note(index, note)
+
+        write_json(config)
+
+def remove_note(uuid: str) -> dict:
+    """
+    removes a note from the config and the indexes, then writes the config.
+    returns the removed note, or {} if there was no note with that uuid.
+    """
+    if _note_backend() == "sqlite":
+        return get_catalog().remove(uuid)
+    if _note_backend() == "frontmatter":
+        # the record goes away with the file itself
+        if note := get_note_by_uuid(uuid):
+            get_scanner().forget(get_base_path(), note)
+        return note
+
+    with _notes_lock:
+        index = _get_index()
+        config = index["config"]
+
+        note = index["by_uuid"].get(uuid)
+        if note is None:
+            return {}
+
+        _unindex_note(index, note)
+
+        # the list keeps the creation order the home page shows, so it has
+        # to be a real removal. finding it by identity is just a pointer scan.
+        notes = config["notes"]
+        for i, other in enumerate(notes):
+            if other is note:
+                notes.pop(i)
+                break
+
+        write_json(config)
+        return note
+
+def update_note(uuid: str, **fields) -> dict:
+    """
+    changes fields of a note in place, keeps the indexes in sync and writes
+    the config. returns the updated note, or {} if there was no such note.
+    """
+    if _note_backend() == "sqlite":
+        return get_catalog().update(uuid, **fields)
+    if _note_backend() == "frontmatter":
+        return _update_header(uuid, **fields)
+
+    with _notes_lock:
+        index = _get_index()
+
+        note = index["by_uuid"].get(uuid)
+        if note is None:
+            return {}
+
+        _unindex_note(index, note)
+        note.update(fields)
+        _index_note(index, note)
+
+        write_json(index["config"])
+        return note
+
+
+def _update_header(uuid: str, **fields) -> dict:
+    note = get_note_by_uuid(uuid)
+    if not note:
         return {}
+
+    body = get_text_in_file(note["file"])
+    get_scanner().forget(get_base_path(), note)
+
+    note.update(fields)
+    _atomic_write(get_file_path(note["file"]), front_matter.render(note) + body)
+    get_scanner().remember(get_base_path(), note)
+
+    return note
+
+
+# anything still queued for settings.json gets written before we go
+atexit.register(flush_config)
+atexit.register(close_catalog)
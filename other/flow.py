@@ -11,14 +11,31 @@ from PySide6.QtWidgets import QApplication, QLayout, QPushButton, QSizePolicy, Q
 
 
 class FlowLayout(QLayout):
+    """
+    the qt flow layout, with the spacing and every item's size hint cached
+    between passes. they get measured again after any change to the items
+    and after every invalidate() from qt.
+
+    relayout is not incremental: every pass (heightForWidth included) flows
+    all the items from the start, there are no cached row breaks. nothing in
+    the app uses this anymore (the home page places its cards itself), so it
+    was kept simple.
+    """
+
     def __init__(self, parent=None):
         super().__init__(parent)
 
+        self._item_list = []
+
+        # (x, y) gaps between items, and every item's size hint.
+        # None until the next pass measures them.
+        self._spacing = None
+        self._hints = None
+
+        # after the caches, this already invalidates
         if parent is not None:
             self.setContentsMargins(QMargins(0, 0, 0, 0))
 
-        self._item_list = []
-
     def __del__(self):
         item = self.takeAt(0)
         while item:
@@ -26,6 +43,7 @@ class FlowLayout(QLayout):
 
     def addItem(self, item):
         self._item_list.append(item)
+        self._hints = None
 
     def count(self):
         return len(self._item_list)
@@ -38,10 +56,17 @@ class FlowLayout(QLayout):
 
     def takeAt(self, index):
         if 0 <= index < len(self._item_list):
+            self._hints = None
             return self._item_list.pop(index)
 
         return None
 
+    def invalidate(self):
+        # a size hint or the style changed
+        self._spacing = None
+        self._hints = None
+        super().invalidate()
+
     def expandingDirections(self):
         return Qt.Orientation(0)
 
@@ -70,14 +95,9 @@ class FlowLayout(QLayout):
         )
         return size
 
-    def _do_layout(self, rect, test_only):
-        x = rect.x()
-        y = rect.y()
-        line_height = 0
-        spacing = self.spacing()
-
-        for item in self._item_list:
-            style = item.widget().style()
+    def _measure(self):
+        if self._spacing is None and self._item_list:
+            style = self._item_list[0].widget().style()
             layout_spacing_x = style.layoutSpacing(
                 QSizePolicy.ControlType.PushButton,
                 QSizePolicy.ControlType.PushButton,
@@ -88,20 +108,35 @@ class FlowLayout(QLayout):
                 QSizePolicy.ControlType.PushButton,
                 Qt.Orientation.Vertical,
             )
-            space_x = spacing + layout_spacing_x
-            space_y = spacing + layout_spacing_y
-            next_x = x + item.sizeHint().width() + space_x
+            self._spacing = (
+                self.spacing() + layout_spacing_x,
+                self.spacing() + layout_spacing_y,
+            )
+
+        if self._hints is None:
+            self._hints = [item.sizeHint() for item in self._item_list]
+
+    def _do_layout(self, rect, test_only):
+        self._measure()
+
+        x = rect.x()
+        y = rect.y()
+        line_height = 0
+        space_x, space_y = self._spacing or (0, 0)
+
+        for item, hint in zip(self._item_list, self._hints):
+            next_x = x + hint.width() + space_x
             if next_x - space_x > rect.right() and line_height > 0:
                 x = rect.x()
                 y = y + line_height + space_y
-                next_x = x + item.sizeHint().width() + space_x
+                next_x = x + hint.width() + space_x
                 line_height = 0
 
             if not test_only:
-                item.setGeometry(QRect(QPoint(x, y), item.sizeHint()))
+                item.setGeometry(QRect(QPoint(x, y), hint))
 
             x = next_x
-            line_height = max(line_height, item.sizeHint().height())
+            line_height = max(line_height, hint.height())
 
         return y + line_height - rect.y()
 
@@ -0,0 +1,246 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from other import layout
+
+"""
+per note metadata, stored as a small header at the top of the note itself:
+
+    ---
+    uuid: 0b5c...
+    title: my note
+    created: 2024-01-01-10-00-00
+    edited: 2024-01-01-10-00-00
+    type: markdown
+    ---
+    the actual note starts here
+
+file_management uses this when the config has "note_backend": "frontmatter".
+the scanner only ever reads the header bytes of a file, never the body.
+"""
+
+FIELDS = ("uuid", "title", "created", "edited", "type")
+EXTENSIONS = (".md", ".txt")
+
+FENCE = "---"
+# a header bigger than this isn't one of ours
+MAX_HEADER_BYTES = 4096
+
+
+def render(note: dict) -> str:
+    """
+    turns a note record into the header that goes on top of the file
+    """
+    lines = [FENCE]
+    for field in FIELDS:
+        value = f"{note.get(field, '')}".replace("\r", " ").replace("\n", " ")
+        lines.append(f"{field}: {value}")
+    lines.append(FENCE)
+    return "\n".join(lines) + "\n"
+
+
+def _parse(lines: list[str]) -> dict:
+    header = {}
+    for line in lines:
+        key, sep, value = line.partition(":")
+        if sep and key.strip() in FIELDS:
+            header[key.strip()] = value.strip()
+    return header
+
+
+def read_header(path: str) -> dict:
+    """
+    reads just the header at the top of the file at path.
+    returns {} if the file doesn't start with one.
+    """
+    with open(path, "rb") as f:
+        if f.readline(len(FENCE) + 2).rstrip(b"\r\n") != FENCE.encode():
+            return {}
+
+        lines = []
+        read = 0
+        while read < MAX_HEADER_BYTES:
+            line = f.readline(MAX_HEADER_BYTES - read)
+            if not line:
+                return {}
+            read += len(line)
+
+            line = line.decode("utf-8", errors="replace").rstrip("\r\n")
+            if line == FENCE:
+                return _parse(lines)
+            lines.append(line)
+
+    return {}
+
+
+def _read_header_if_there(path: str) -> dict:
+    try:
+        return read_header(path)
+    except FileNotFoundError:
+        return {}
+
+
+def split(text: str) -> tuple[dict, str]:
+    """
+    splits the full text of a note into (header, body)
+    """
+    if not text.startswith(FENCE + "\n"):
+        return {}, text
+
+    end = text.find(f"\n{FENCE}\n", len(FENCE))
+    if end == -1 or end > MAX_HEADER_BYTES:
+        return {}, text
+
+    header = _parse(text[len(FENCE) + 1 : end].split("\n"))
+    return header, text[end + len(FENCE) + 2 :]
+
+
+class HeaderScanner:
+    """
+    builds the note list by reading the header of every note under a
+    directory. headers are read in parallel, and a file whose mtime and
+    size haven't changed since the last scan isn't opened again.
+    """
+
+    def __init__(self, note_layout: str = layout.FLAT, max_workers: int = 8):
+        self.layout = note_layout
+        self.max_workers = max_workers
+        self.lock = threading.Lock()
+
+        # path -> (mtime_ns, size, note)
+        self.cache = {}
+        self.by_uuid = {}
+        self.by_file = {}
+        self.base_path = None
+
+    def reset(self) -> None:
+        with self.lock:
+            self.cache = {}
+            self.by_uuid = {}
+            self.by_file = {}
+            self.base_path = None
+
+    def _walk(self, base_path: str):
+        stack = [base_path]
+        while stack:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    # .notewriter and friends aren't notes
+                    if entry.name.startswith("."):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.endswith(EXTENSIONS):
+                        yield entry
+
+    def _note_for(self, base_path: str, path: str, header: dict) -> dict:
+        note = {field: header.get(field, "") for field in FIELDS}
+
+        # in the sharded layout the shard comes from the uuid, not the file
+        if self.layout == layout.SHARDED:
+            note["file"] = os.path.basename(path)
+        else:
+            note["file"] = os.path.relpath(path, base_path).replace(os.sep, "/")
+
+        return note
+
+    def path_for(self, base_path: str, note: dict) -> str:
+        return layout.note_path(base_path, self.layout, note["uuid"], note["file"])
+
+    def scan(self, base_path: str) -> list[dict]:
+        """
+        returns every note under base_path, oldest first
+        """
+        if base_path != self.base_path:
+            self.reset()
+            self.base_path = base_path
+
+        cache = {}
+        stale = []
+        for entry in self._walk(base_path):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                # deleted while we were looking
+                continue
+            cached = self.cache.get(entry.path)
+            if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+                cache[entry.path] = cached
+            else:
+                stale.append((entry.path, stat))
+
+        if stale:
+            with ThreadPoolExecutor(self.max_workers) as pool:
+                headers = pool.map(_read_header_if_there, [path for path, _ in stale])
+
+                for (path, stat), header in zip(stale, headers):
+                    # files without a header aren't tracked notes
+                    if header.get("uuid"):
+                        note = self._note_for(base_path, path, header)
+                        cache[path] = (stat.st_mtime_ns, stat.st_size, note)
+
+        notes = sorted(
+            (cached[2] for cached in cache.values()),
+            key=lambda note: (note["created"], note["title"]),
+        )
+
+        with self.lock:
+            self.cache = cache
+            self.by_uuid = {note["uuid"]: note for note in notes}
+            self.by_file = {note["file"]: note for note in notes}
+
+        return notes
+
+    def get(self, base_path: str, uuid: str = "", filename: str = "") -> dict:
+        """
+        looks a note up by uuid or file. only the one file gets re-checked,
+        the whole directory is only scanned the first time.
+        """
+        if base_path != self.base_path:
+            self.scan(base_path)
+
+        with self.lock:
+            note = self.by_uuid.get(uuid) if uuid else self.by_file.get(filename)
+
+        if note is None:
+            return {}
+
+        path = self.path_for(base_path, note)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self.forget(base_path, note)
+            return {}
+
+        cached = self.cache.get(path)
+        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return note
+
+        header = read_header(path)
+        if not header.get("uuid"):
+            self.forget(base_path, note)
+            return {}
+
+        note.update(self._note_for(base_path, path, header))
+        self.remember(base_path, note)
+        return note
+
+    def remember(self, base_path: str, note: dict) -> None:
+        """
+        (re)registers a note whose file was just written by us
+        """
+        path = self.path_for(base_path, note)
+        stat = os.stat(path)
+
+        with self.lock:
+            self.cache[path] = (stat.st_mtime_ns, stat.st_size, note)
+            self.by_uuid[note["uuid"]] = note
+            self.by_file[note["file"]] = note
+
+    def forget(self, base_path: str, note: dict) -> None:
+        with self.lock:
+            self.cache.pop(self.path_for(base_path, note), None)
+            self.by_uuid.pop(note["uuid"], None)
+            if self.by_file.get(note["file"]) is note:
+                self.by_file.pop(note["file"])
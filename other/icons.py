@@ -0,0 +1,60 @@
+from PySide6.QtCore import QSize, Qt
+from PySide6.QtGui import QGuiApplication, QIcon, QPainter, QPixmap
+from PySide6.QtSvg import QSvgRenderer
+
+"""
+one shared QIcon per svg.
+
+every card, button and checkbox used to build its own QIcon from the svg
+path, so each one parsed (and rasterized) the same file again. here every
+svg gets parsed once, drawn at the sizes the app uses, and the same QIcon
+is handed to everyone asking for it.
+"""
+
+ICON_DIR = "/home/zach/Desktop/icons"
+# the sizes icons are shown at (the small card buttons, everything else)
+ICON_SIZES = (20, 32)
+
+# path -> QIcon
+_icons = {}
+
+
+def _rasterize(path: str) -> QIcon:
+    renderer = QSvgRenderer(path)
+    if not renderer.isValid():
+        # missing or broken, let qt deal with it like it used to (once)
+        return QIcon(path)
+
+    # sharp on hidpi screens too
+    ratio = QGuiApplication.instance().devicePixelRatio()
+
+    icon = QIcon()
+    for size in ICON_SIZES:
+        pixmap = QPixmap(QSize(size, size) * ratio)
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.GlobalColor.transparent)
+
+        painter = QPainter(pixmap)
+        renderer.render(painter)
+        painter.end()
+
+        icon.addPixmap(pixmap)
+
+    return icon
+
+
+def get_icon_from_file(path: str) -> QIcon:
+    """
+    the shared icon for the svg at path
+    """
+    if path not in _icons:
+        _icons[path] = _rasterize(path)
+
+    return _icons[path]
+
+
+def get_icon(name: str) -> QIcon:
+    """
+    the shared icon for ICON_DIR/name.svg
+    """
+    return get_icon_from_file(f"{ICON_DIR}/{name}.svg")
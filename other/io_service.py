@@ -0,0 +1,143 @@
+import threading
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from PySide6.QtCore import QObject, Signal
+
+"""
+runs file reads and writes on a pool of worker threads, so the gui never
+blocks on the disk.
+
+every request has a key (usually the note's uuid). requests with the same key
+run one after another, in the order they were submitted, so a read queued
+after a write to the same note always sees that write. requests with
+different keys run in parallel.
+
+results come back on the gui thread, through the callback / errback given to
+submit().
+"""
+
+
+class IORequest:
+    def __init__(self, key: str, function: Callable, args: tuple,
+                 callback: Callable | None, errback: Callable | None):
+        self.key = key
+        self.function = function
+        self.args = args
+        self.callback = callback
+        self.errback = errback
+
+        # resolved on the worker thread, so other threads can wait on it too
+        self.future = Future()
+        self.dropped = False
+
+    def cancel(self) -> None:
+        """
+        the request won't run if it hasn't started yet, and either way
+        its callbacks won't get called anymore
+        """
+        self.dropped = True
+        self.future.cancel()
+
+
+class IOService(QObject):
+
+    # emitted from the worker threads, delivered on the gui thread
+    _completed = Signal(object)
+
+    def __init__(self, max_workers: int = 4, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.pool = ThreadPoolExecutor(max_workers, thread_name_prefix="io")
+        self.lock = threading.Lock()
+
+        # key -> the request currently running with that key
+        self.running = {}
+        # key -> requests waiting for the one currently running with that key
+        self.queues = {}
+
+        self._completed.connect(self._deliver)
+
+    def submit(self, key: str, function: Callable, *args,
+               callback: Callable | None = None,
+               errback: Callable | None = None) -> IORequest:
+        """
+        runs function(*args) on a worker thread. callback gets the return
+        value and errback the exception, both on the gui thread.
+        """
+        request = IORequest(key, function, args, callback, errback)
+
+        with self.lock:
+            if key in self.queues:
+                self.queues[key].append(request)
+                return request
+            self.queues[key] = deque()
+            self.running[key] = request
+
+        self.pool.submit(self._run, request)
+        return request
+
+    def cancel(self, key: str) -> None:
+        """
+        cancels every request for key that hasn't finished yet
+        """
+        with self.lock:
+            requests = list(self.queues.get(key, ()))
+            if key in self.running:
+                requests.append(self.running[key])
+
+        for request in requests:
+            request.cancel()
+
+    def _run(self, request: IORequest) -> None:
+        if request.future.set_running_or_notify_cancel():
+            try:
+                result = request.function(*request.args)
+            except BaseException as e:
+                request.future.set_exception(e)
+            else:
+                request.future.set_result(result)
+
+            self._completed.emit(request)
+
+        self._next(request.key)
+
+    def _next(self, key: str) -> None:
+        with self.lock:
+            queue = self.queues[key]
+            if not queue:
+                del self.queues[key]
+                del self.running[key]
+                return
+            request = queue.popleft()
+            self.running[key] = request
+
+        self.pool.submit(self._run, request)
+
+    def _deliver(self, request: IORequest) -> None:
+        if request.dropped:
+            return
+
+        error = request.future.exception()
+        if error is None:
+            if request.callback:
+                request.callback(request.future.result())
+        elif request.errback:
+            request.errback(error)
+        else:
+            raise error
+
+
+_service = {
+    "service": None,
+}
+
+
+def get_io_service() -> IOService:
+    """
+    the shared io service. the first call has to come from the gui thread.
+    """
+    if _service["service"] is None:
+        _service["service"] = IOService()
+
+    return _service["service"]
@@ -0,0 +1,252 @@
+import json
+import os
+import zlib
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from other import file_management
+from other import layout
+from other.autosave import content_hash
+
+"""
+append-only edit journal for notes.
+
+instead of rewriting the whole note on every save, the edits since the last
+save get appended to a small log next to the note (.<file>.journal). once the
+log gets bigger than COMPACT_THRESHOLD, it's folded back into the note file
+in the background and started over. loading a note replays the log on top of
+the note file.
+
+every edit is (position, removed, inserted), with positions counted the way
+QTextDocument counts them (utf-16 code units).
+
+the first line of a journal holds a checksum of the text it applies to. if
+the app dies right after a compaction wrote the note but before the journal
+was removed, the checksum won't match anymore and the journal gets dropped
+instead of being applied twice.
+"""
+
+# fold the journal back into the note once it's bigger than this (bytes)
+COMPACT_THRESHOLD = 1024 * 1024
+
+# all journal (and swap file) writes and compactions happen here, one at a
+# time and in the order they were asked for, so the gui never waits on the disk
+worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix="journal")
+
+
+def journal_path(note_path: str) -> str:
+    return layout.companion_path(note_path, layout.JOURNAL)
+
+
+def checksum(text: str) -> int:
+    return zlib.crc32(text.encode("utf-8", errors="surrogatepass"))
+
+
+def utf16_length(text: str) -> int:
+    return len(text.encode("utf-16-le", errors="surrogatepass")) // 2
+
+
+def apply(text: str, deltas: list) -> str:
+    """
+    applies (position, removed, inserted) edits to text, in order
+    """
+    if not deltas:
+        return text
+
+    buffer = bytearray(text.encode("utf-16-le", errors="surrogatepass"))
+    for position, removed, inserted in deltas:
+        buffer[position * 2 : (position + removed) * 2] = inserted.encode(
+            "utf-16-le", errors="surrogatepass"
+        )
+
+    return buffer.decode("utf-16-le", errors="surrogatepass")
+
+
+def read(path: str) -> tuple[int | None, list]:
+    """
+    reads a journal file, returns (checksum of the base text, edits)
+    """
+    try:
+        with open(path, "r", encoding="utf-8", errors="surrogatepass") as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return None, []
+
+    if not lines:
+        return None, []
+
+    try:
+        base = json.loads(lines[0])["base"]
+    except (ValueError, KeyError, TypeError):
+        return None, []
+
+    deltas = []
+    for line in lines[1:]:
+        try:
+            position, removed, inserted = json.loads(line)
+        except (ValueError, TypeError):
+            # a half written line from a crash, everything before it is fine
+            break
+        deltas.append((position, removed, inserted))
+
+    return base, deltas
+
+
+def once_done(after: Future | None, function: Callable) -> Callable:
+    """
+    wraps function so that, when it runs on the worker, it first waits for
+    the after future and is skipped if that failed
+    """
+    if after is None:
+        return function
+
+    def wrapper():
+        if not after.cancelled() and after.exception() is None:
+            function()
+
+    return wrapper
+
+
+def delete_note(note: dict) -> None:
+    """
+    deletes a note's file along with its journal and swap file. they go
+    once any writes still queued for them are done, so nothing can bring
+    them back afterwards. blocks, so call it from an io thread.
+    """
+    worker.submit(file_management.delete_file, note).result()
+
+
+def load_text(filename: str) -> str:
+    """
+    the text of a note as it was last saved, journal included
+    """
+    text = file_management.get_text_in_file(filename)
+
+    base, deltas = read(journal_path(file_management.get_file_path(filename)))
+    if base is not None and base == checksum(text):
+        text = apply(text, deltas)
+
+    return text
+
+
+def load_snippet(filename: str) -> str:
+    """
+    the preview snippet of a note. only notes with unsaved-to-file edits
+    in their journal get read in full.
+    """
+    if os.path.exists(journal_path(file_management.get_file_path(filename))):
+        return file_management.make_snippet(load_text(filename))
+
+    return file_management.get_snippet(filename)
+
+
+class NoteJournal:
+    def __init__(self, filename: str, threshold: int = COMPACT_THRESHOLD):
+        self.filename = filename
+        self.threshold = threshold
+        self.path = journal_path(file_management.get_file_path(filename))
+
+        # checksum of the note file's text the journal applies on top of
+        self.base = None
+        # content hash of the note as of the last append (journal included),
+        # so an append that wouldn't change it can be skipped
+        self.saved_hash = None
+        # why an append failed. the edits after it count on the ones that
+        # went missing, so nothing gets appended until a full save discards
+        # the journal.
+        self.failed = None
+
+    def replay(self, text: str) -> str:
+        """
+        takes the text of the note file and returns it with the journal
+        applied. call this once, when the note gets loaded.
+        """
+        self.base = checksum(text)
+
+        base, deltas = read(self.path)
+        if base is not None and base != self.base:
+            # already folded into the note file by a compaction
+            self._remove()
+        elif base is not None:
+            text = apply(text, deltas)
+
+        self.saved_hash = content_hash(text)
+        return text
+
+    def append(self, deltas: list, text: str) -> Future:
+        """
+        queues edits to be appended to the journal. text is the note with
+        them applied. the future's result is whether anything got written,
+        edits that end up right back at the last appended text are skipped.
+        """
+        return worker.submit(self._append, list(deltas), text)
+
+    def compact(self) -> Future:
+        """
+        queues folding the journal into the note file
+        """
+        return worker.submit(self._compact)
+
+    def discard(self, after: Future | None = None) -> Future:
+        """
+        queues removing the journal, for when the whole note got written
+        some other way. if after is given (that write), the journal stays
+        unless it finishes without an error.
+        """
+        return worker.submit(once_done(after, self._discard))
+
+    def _append(self, deltas: list, text: str) -> bool:
+        if self.failed:
+            raise self.failed
+
+        # typed and then deleted again, the journal already ends up there
+        text_hash = content_hash(text)
+        if not deltas or text_hash == self.saved_hash:
+            return False
+
+        lines = []
+        if not os.path.exists(self.path):
+            lines.append(json.dumps({"base": self.base}))
+        lines.extend(json.dumps(delta) for delta in deltas)
+
+        try:
+            with open(self.path, "a", encoding="utf-8", errors="surrogatepass") as f:
+                f.write("\n".join(lines) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError as error:
+            self.failed = error
+            raise
+        self.saved_hash = text_hash
+
+        if os.path.getsize(self.path) > self.threshold:
+            self._compact()
+
+        return True
+
+    def _compact(self) -> None:
+        base, deltas = read(self.path)
+        if base is None:
+            return
+
+        text = file_management.get_text_in_file(self.filename)
+        if base == checksum(text):
+            text = apply(text, deltas)
+            file_management.write_to_file(self.filename, text, atomic=True)
+
+        self.base = checksum(text)
+        self._remove()
+
+    def _discard(self) -> None:
+        self._remove()
+        self.failed = None
+
+        text = file_management.get_text_in_file(self.filename)
+        self.base = checksum(text)
+        self.saved_hash = content_hash(text)
+
+    def _remove(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,93 @@
+import os
+
+"""
+where note files live on disk, relative to the base path.
+
+"flat" is the original layout, every note sits right in the base path.
+"sharded" puts each note in a subdirectory named after the first characters
+of its uuid (base_path/3f/my_note.md), so no single directory ends up with
+tens of thousands of entries.
+
+the "file" of a note never includes the shard, file_management resolves it
+through note_path() instead.
+
+a note can have hidden companion files right next to it (.<file>.journal,
+.<file>.swp). they belong to the note, so they move and get deleted with it.
+"""
+
+FLAT = "flat"
+SHARDED = "sharded"
+
+SHARD_LENGTH = 2
+
+# the companion files a note can have, see companion_path()
+JOURNAL = "journal"
+SWAP = "swp"
+COMPANIONS = (JOURNAL, SWAP)
+
+
+def shard_for(uuid: str) -> str:
+    return uuid.replace("-", "")[:SHARD_LENGTH].lower()
+
+
+def note_path(base_path: str, layout: str, uuid: str, filename: str) -> str:
+    if layout == SHARDED and uuid:
+        return f"{base_path}/{shard_for(uuid)}/{filename}"
+
+    return f"{base_path}/{filename}"
+
+
+def companion_path(note_path: str, kind: str) -> str:
+    directory, name = os.path.split(note_path)
+    return os.path.join(directory, f".{name}.{kind}")
+
+
+def companion_paths(note_path: str) -> list[str]:
+    return [companion_path(note_path, kind) for kind in COMPANIONS]
+
+
+def migrate(base_path: str, notes: list[dict], from_layout: str, to_layout: str) -> int:
+    """
+    moves every note file (and its companion files) from one layout to the
+    other. files that were already moved are skipped, so if it gets
+    interrupted it can just be run again. returns how many notes were moved.
+    """
+    moved = 0
+
+    for note in notes:
+        old = note_path(base_path, from_layout, note["uuid"], note["file"])
+        new = note_path(base_path, to_layout, note["uuid"], note["file"])
+
+        if old == new:
+            continue
+
+        # companions first, a journal left behind would lose its edits
+        pairs = list(zip(companion_paths(old), companion_paths(new)))
+        for old_path, new_path in pairs + [(old, new)]:
+            if not os.path.exists(old_path) or os.path.exists(new_path):
+                continue
+
+            os.makedirs(os.path.dirname(new_path), exist_ok=True)
+            os.replace(old_path, new_path)
+            if old_path == old:
+                moved += 1
+
+    if from_layout == SHARDED:
+        # leave no empty shard directories behind
+        for note in notes:
+            try:
+                os.rmdir(f"{base_path}/{shard_for(note['uuid'])}")
+            except OSError:
+                pass
+
+    return moved
+
+
+if __name__ == "__main__":
+    # python -m other.layout [flat|sharded]
+    import sys
+    from other import file_management
+
+    target = sys.argv[1] if len(sys.argv) > 1 else SHARDED
+    moved = file_management.migrate_layout(target)
+    print(f"moved {moved} notes into the {target} layout")
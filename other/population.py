@@ -0,0 +1,135 @@
+import time
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QTimer, Signal
+
+from other.previews import get_preview_cache
+
+"""
+fills in the home page's preview snippets in the background.
+
+the notes get split into batches that are read on a QThreadPool (through the
+preview cache, so an unchanged note only costs a stat). finished batches are
+handed to the gui a few at a time from a timer, never for more than
+APPLY_SLICE_MS in one go, so the page stays responsive while thousands of
+previews come in.
+"""
+
+# notes per background batch, if the settings don't say
+DEFAULT_BATCH_SIZE = 64
+# longest the gui spends applying results before letting events through
+APPLY_SLICE_MS = 8
+# results handed over per loaded signal
+APPLY_CHUNK = 16
+
+
+class SnippetBatch(QRunnable):
+    def __init__(self, populator, generation: int, notes: list):
+        super().__init__()
+
+        self.populator = populator
+        self.generation = generation
+        self.notes = notes
+
+    def run(self):
+        # superseded by a newer start() before it got a thread
+        if self.generation != self.populator.generation:
+            return
+
+        cache = get_preview_cache()
+        results = []
+        for note in self.notes:
+            try:
+                results.append((note["uuid"], cache.snippet(note)))
+            except Exception:
+                # deleted (or unreadable, or not text) since the list was
+                # made. the batch still has to report back, or the
+                # populator would wait for it forever.
+                continue
+
+        self.populator._batchDone.emit(self.generation, results)
+
+
+class PreviewPopulator(QObject):
+
+    # a chunk of (uuid, snippet) pairs, ready to show
+    loaded = Signal(list)
+    # everything from the last start() has been loaded
+    finished = Signal()
+
+    # emitted from the pool threads
+    _batchDone = Signal(int, object)
+
+    def __init__(self, batch_size: int = DEFAULT_BATCH_SIZE, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self.batch_size = batch_size
+        self.pool = QThreadPool(self)
+
+        # bumped by every start(), older batches get dropped
+        self.generation = 0
+        # batches of this generation that haven't come back yet
+        self.remaining = 0
+        # results waiting for their time slice
+        self.pending = []
+        self.running = False
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.apply_slice)
+
+        self._batchDone.connect(self.batch_done)
+
+    def start(self, notes: list) -> None:
+        """
+        loads the snippets of notes, in the order given, dropping whatever
+        an earlier start() still had queued
+        """
+        self.generation += 1
+        self.remaining = 0
+        self.pending = []
+        self.running = True
+
+        self._queue(notes, 0)
+        self.timer.start()
+
+    def load_now(self, notes: list) -> None:
+        """
+        loads notes ahead of everything else already queued
+        """
+        if not notes:
+            return
+
+        if not self.running:
+            self.start(notes)
+            return
+
+        self._queue(notes, 1)
+
+    def _queue(self, notes: list, priority: int) -> None:
+        for start in range(0, len(notes), max(1, self.batch_size)):
+            batch = notes[start : start + max(1, self.batch_size)]
+            self.remaining += 1
+            self.pool.start(SnippetBatch(self, self.generation, batch), priority)
+
+    def batch_done(self, generation: int, results: list) -> None:
+        if generation != self.generation:
+            return
+
+        self.remaining -= 1
+        self.pending.extend(results)
+        self.timer.start()
+
+    def apply_slice(self) -> None:
+        started = time.perf_counter()
+
+        while self.pending:
+            chunk = self.pending[:APPLY_CHUNK]
+            del self.pending[:APPLY_CHUNK]
+            self.loaded.emit(chunk)
+
+            if (time.perf_counter() - started) * 1000 >= APPLY_SLICE_MS:
+                return
+
+        self.timer.stop()
+        if self.running and not self.remaining:
+            self.running = False
+            self.finished.emit()
@@ -0,0 +1,158 @@
+import atexit
+import json
+import os
+import threading
+
+from other import file_management
+from other import journal
+
+"""
+on-disk cache of the home page preview snippets, kept in
+{base_path}/.notewriter/previews.json.
+
+each entry remembers which file its snippet came from, along with that
+file's mtime and size (and the journal's, if the note has one). while a stat
+says none of that changed, the cached snippet gets used, so starting up with
+an unchanged tomb doesn't read a single note.
+"""
+
+# seconds to wait after a change before the cache gets written out
+FLUSH_DELAY = 2.0
+
+
+def _stamp(path: str) -> list | None:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+class PreviewCache:
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+
+        # uuid -> {"file", "stamp", "journal", "snippet"}
+        self.entries = self._read()
+        self.dirty = False
+        self.timer = None
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+        return entries if isinstance(entries, dict) else {}
+
+    def snippet(self, note: dict) -> str:
+        """
+        the preview snippet of a note, straight from the cache if its file
+        hasn't changed. called from the io threads.
+        """
+        path = file_management.get_file_path(note["file"])
+        stat = os.stat(path)
+        stamp = [stat.st_mtime_ns, stat.st_size]
+        journal_stamp = _stamp(journal.journal_path(path))
+
+        with self.lock:
+            entry = self.entries.get(note["uuid"])
+
+        if (
+            entry
+            and entry.get("file") == note["file"]
+            and entry.get("stamp") == stamp
+            and entry.get("journal") == journal_stamp
+        ):
+            return entry["snippet"]
+
+        snippet = journal.load_snippet(note["file"])
+
+        with self.lock:
+            self.entries[note["uuid"]] = {
+                "file": note["file"],
+                "stamp": stamp,
+                "journal": journal_stamp,
+                "snippet": snippet,
+            }
+        self._changed()
+
+        return snippet
+
+    def forget(self, uuid: str) -> None:
+        with self.lock:
+            if self.entries.pop(uuid, None) is None:
+                return
+        self._changed()
+
+    def prune(self, uuids: set) -> None:
+        """
+        drops the entries of every note that isn't in uuids anymore
+        """
+        with self.lock:
+            stale = [uuid for uuid in self.entries if uuid not in uuids]
+            for uuid in stale:
+                del self.entries[uuid]
+
+        if stale:
+            self._changed()
+
+    def _changed(self) -> None:
+        with self.lock:
+            self.dirty = True
+            if self.timer is not None:
+                return
+            self.timer = threading.Timer(FLUSH_DELAY, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def flush(self) -> None:
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+            if not self.dirty:
+                return
+            contents = json.dumps(self.entries)
+            self.dirty = False
+
+        # it's only a cache, so no fsync. the rename still means a crash
+        # leaves either the old file or the new one, never half of one.
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write(contents)
+            os.replace(temp_path, self.path)
+        except OSError:
+            with self.lock:
+                self.dirty = True
+
+
+_cache = {
+    "cache": None,
+}
+
+
+def get_preview_cache() -> PreviewCache:
+    """
+    the preview cache of the current base path
+    """
+    path = file_management.get_preview_cache_path()
+    cache = _cache["cache"]
+    if cache is None or cache.path != path:
+        if cache is not None:
+            cache.flush()
+        cache = _cache["cache"] = PreviewCache(path)
+
+    return cache
+
+
+def flush_previews() -> None:
+    if _cache["cache"] is not None:
+        _cache["cache"].flush()
+
+
+atexit.register(flush_previews)
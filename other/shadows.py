@@ -0,0 +1,91 @@
+from PySide6.QtCore import QPoint, QRectF, QSize, Qt
+from PySide6.QtGui import QColor, QImage, QPainter, QPainterPath, QPixmap
+from PySide6.QtWidgets import (
+    QGraphicsDropShadowEffect,
+    QGraphicsPixmapItem,
+    QGraphicsScene,
+)
+
+"""
+pre-rendered drop shadows.
+
+a QGraphicsDropShadowEffect renders its widget offscreen and blurs it again
+on every repaint. every card has the same rounded rect shadow though, so the
+effect gets run once here, on just the shape, and the pixmap is drawn behind
+each card instead.
+the offset is just where the pixmap gets drawn, so hovering (the bigger
+offset) uses the same pixmap.
+"""
+
+SHADOW_BLUR = 20
+SHADOW_COLOR = QColor(255, 255, 255, 50)
+
+# (width, height, radius, blur, rgba) -> QPixmap
+_shadows = {}
+
+
+def _render(size: QSize, radius: int, blur: int, color: QColor) -> QPixmap:
+    # room for the blur to spread out on every side
+    margin = blur
+
+    path = QPainterPath()
+    path.addRoundedRect(
+        QRectF(margin, margin, size.width(), size.height()), radius, radius
+    )
+
+    shape = QPixmap(size.width() + 2 * margin, size.height() + 2 * margin)
+    shape.fill(Qt.GlobalColor.transparent)
+    painter = QPainter(shape)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    painter.fillPath(path, Qt.GlobalColor.black)
+    painter.end()
+
+    # the exact effect the cards used to have, run once. the shadow gets
+    # pushed a whole pixmap down so it can be rendered without the shape.
+    scene = QGraphicsScene()
+    item = QGraphicsPixmapItem(shape)
+    effect = QGraphicsDropShadowEffect()
+    effect.setBlurRadius(blur)
+    effect.setOffset(0, shape.height())
+    effect.setColor(color)
+    item.setGraphicsEffect(effect)
+    scene.addItem(item)
+
+    # the scene only draws items whose own rect is in view, so render the
+    # shape too and keep the bottom half
+    image = QImage(
+        shape.width(), 2 * shape.height(), QImage.Format.Format_ARGB32_Premultiplied
+    )
+    image.fill(Qt.GlobalColor.transparent)
+    painter = QPainter(image)
+    scene.render(
+        painter,
+        QRectF(image.rect()),
+        QRectF(0, 0, shape.width(), 2 * shape.height()),
+    )
+    painter.end()
+
+    return QPixmap.fromImage(
+        image.copy(0, shape.height(), shape.width(), shape.height())
+    )
+
+
+def shadow_pixmap(
+    size: QSize, radius: int, blur: int = SHADOW_BLUR, color: QColor = SHADOW_COLOR
+) -> QPixmap:
+    """
+    the shadow of a size sized rounded rect. it's blur pixels bigger on
+    every side, see shadow_margin().
+    """
+    key = (size.width(), size.height(), radius, blur, color.rgba())
+    if key not in _shadows:
+        _shadows[key] = _render(size, radius, blur, color)
+
+    return _shadows[key]
+
+
+def shadow_margin(blur: int = SHADOW_BLUR) -> QPoint:
+    """
+    where the shadow pixmap starts, relative to the (unshifted) rect
+    """
+    return QPoint(-blur, -blur)
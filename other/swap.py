@@ -0,0 +1,103 @@
+import json
+import os
+from concurrent.futures import Future
+
+from other import file_management
+from other import journal
+from other import layout
+
+"""
+vim style swap files for open notes.
+
+while a note is open, the edits that haven't been saved yet get appended to
+.<file>.swp next to the note every SWAP_INTERVAL milliseconds. saving removes
+the swap file. if the app dies, the swap file is still there the next time
+the note is opened, and its edits can be replayed on top of the saved text.
+
+a swap file uses the same format as the journal (see other/journal.py): a
+checksum of the saved text it applies to, then (position, removed, inserted)
+edits. all writes go through the journal's worker, so they land in the same
+order as the journal writes of the same note.
+"""
+
+# how often (ms) unsaved edits get flushed to the swap file
+SWAP_INTERVAL = 2000
+
+
+def swap_path(note_path: str) -> str:
+    return layout.companion_path(note_path, layout.SWAP)
+
+
+class SwapFile:
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.note_path = file_management.get_file_path(filename)
+        self.path = swap_path(self.note_path)
+
+        # checksum of the saved text the swap file applies to. None means
+        # "whatever is on disk right now", worked out on the next write.
+        self.base = None
+
+    def start(self, text: str) -> None:
+        """
+        call with the text that just got loaded into the editor
+        """
+        self.base = journal.checksum(text)
+
+    def recover(self, text: str) -> list:
+        """
+        returns the edits in a swap file left behind for this note,
+        or [] if there's nothing (usable) to recover.
+        text is the saved text of the note, journal included.
+        """
+        try:
+            stale = os.path.getmtime(self.path) < os.path.getmtime(self.note_path)
+        except FileNotFoundError:
+            return []
+
+        base, deltas = (None, []) if stale else journal.read(self.path)
+        if base is None or base != journal.checksum(text):
+            # new edits would end up under its old header, start over
+            journal.worker.submit(self._remove)
+            return []
+
+        return deltas
+
+    def append(self, deltas: list) -> Future:
+        """
+        queues unsaved edits to be added to the swap file
+        """
+        return journal.worker.submit(self._append, list(deltas))
+
+    def clear(self, after: Future | None = None) -> Future:
+        """
+        queues removing the swap file, for after the note got saved.
+        if after is given (the save itself), the swap file stays unless
+        that finishes without an error.
+        """
+        return journal.worker.submit(journal.once_done(after, self._clear))
+
+    def _append(self, deltas: list) -> None:
+        if not deltas:
+            return
+
+        lines = []
+        if not os.path.exists(self.path):
+            if self.base is None:
+                self.base = journal.checksum(journal.load_text(self.filename))
+            lines.append(json.dumps({"base": self.base}))
+        lines.extend(json.dumps(delta) for delta in deltas)
+
+        # no fsync, this is about surviving the app dying, not the machine
+        with open(self.path, "a", encoding="utf-8", errors="surrogatepass") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def _clear(self) -> None:
+        self.base = None
+        self._remove()
+
+    def _remove(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
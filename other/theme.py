@@ -0,0 +1,92 @@
+from PySide6.QtWidgets import QWidget
+
+"""
+the stylesheets of everything that looks different while hovered, built once.
+
+these widgets used to call setStyleSheet with a freshly formatted sheet from
+every enterEvent / leaveEvent, which makes qt parse the sheet again and
+re-polish the widget and everything in it. now each of them gets its sheet
+once, with its states written in:
+
+- :hover, when the hovered widget is the one that changes. qt handles it
+  without touching the sheet or re-polishing anything.
+- a dynamic property flipped by set_state(), when the hover is somewhere
+  else (a card's info section lights up while the card is hovered). only
+  that one widget gets re-polished.
+
+qt prefers a widget's own sheet and its parents' sheets over the
+application's, and these widgets all sit under parents with catch-all rules,
+so the sheets go on the widgets themselves instead of on the app.
+"""
+
+BACKGROUND = "#303030"
+HOVER_BACKGROUND = "#404040"
+# the make note prompt's buttons only light up a little
+SUBTLE_HOVER_BACKGROUND = "#353535"
+
+# top bar and side bar buttons
+ICON_BUTTON = f"""
+QPushButton{{
+    background-color: {BACKGROUND};
+    border: none;
+}}
+QPushButton:hover{{
+    background-color: {HOVER_BACKGROUND};
+}}
+"""
+
+# the settings page's save button
+SAVE_BUTTON = f"""
+QPushButton{{
+    border: 1px solid white;
+    background-color: {BACKGROUND};
+    color: white;
+    border-radius: 10px;
+}}
+QPushButton:hover{{
+    background-color: {HOVER_BACKGROUND};
+}}
+"""
+
+# the make note prompt's create / cancel buttons
+PROMPT_BUTTON = f"""
+QPushButton{{
+    background-color: {BACKGROUND};
+    color: white;
+}}
+QPushButton:hover{{
+    background-color: {SUBTLE_HOVER_BACKGROUND};
+}}
+"""
+
+# the bottom part of a note card, "hovered" follows the card. what's inside it
+# is see-through, so only the section itself needs re-polishing on hover.
+CARD_INFO_SECTION = f"""
+#info-section, #info-section *{{
+    background-color: {BACKGROUND};
+    color: white;
+    border-top-left-radius: 0px;
+    border-top-right-radius: 0px;
+}}
+#info-section[hovered="true"]{{
+    background-color: {HOVER_BACKGROUND};
+}}
+#info-section *{{
+    background-color: transparent;
+}}
+"""
+
+
+def set_state(widget: QWidget, name: str, value) -> None:
+    """
+    flips a state property that the widget's sheet has rules for, and
+    re-polishes just that widget so they apply
+    """
+    if widget.property(name) == value:
+        return
+
+    widget.setProperty(name, value)
+    style = widget.style()
+    style.unpolish(widget)
+    style.polish(widget)
+    widget.update()
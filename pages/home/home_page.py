@@ -1,9 +1,14 @@
 from PySide6.QtCore import *
 from PySide6.QtGui import *
 from PySide6.QtWidgets import *
-import os
 from other import file_management
-from other.flow import FlowLayout
+from other import journal
+from other.icons import get_icon
+from other.previews import get_preview_cache
+from other.shadows import shadow_margin, shadow_pixmap
+from other import theme
+from other.io_service import get_io_service
+from other.population import DEFAULT_BATCH_SIZE, PreviewPopulator
 
 from widgets.make_note_prompt import MakeNotePrompt
 from widgets.top_bar import TopBar
@@ -13,6 +18,7 @@ class HomePage(QFrame):
 
     noteSelected = Signal(str)
     noteCreated = Signal(str, QFrame)
+    populationFinished = Signal()
 
     def __init__(self, config, *args, **kwargs):
         super().__init__(*args, *kwargs)
@@ -31,7 +37,7 @@ class HomePage(QFrame):
         self.top_bar = TopBar()
         self.top_bar.add_button(
             "create_note",
-            QIcon("/home/zach/Desktop/icons/light_add.svg"),
+            get_icon("light_add"),
             self.launch_create_note
         )
         self.main_layout.addWidget(self.top_bar)
@@ -45,6 +51,7 @@ class HomePage(QFrame):
 
         self.note_container.noteSelected.connect(self.noteSelected)
         self.note_container.noteCreated.connect(self.noteCreated)
+        self.note_container.populationFinished.connect(self.populationFinished)
 
         self.main_layout.addLayout(self.special_layout)
 
@@ -55,75 +62,370 @@ class HomePage(QFrame):
 
     def make_note(self, dictionary: dict) -> None:
         path = self.config['base_path']
-        data = file_management.get_config()
-        data['notes'].append(dictionary)
 
         # write to the json
-        file_management.write_json(data)
+        file_management.add_note(dictionary)
 
         # make the actual file
         file_management.create_file(dictionary['file'])
 
         self.note_container.load_notes(path)
 
+# every card is the same size, which is what lets the grid be virtual
+CARD_WIDTH = 382
+CARD_HEIGHT = 200
+CARD_SPACING = 25
+CARD_RADIUS = 10
+SHADOW_OFFSET = QPoint(5, 5)
+HOVER_SHADOW_OFFSET = QPoint(10, 10)
+# rows of cards kept alive above and below the ones on screen
+OVERSCAN_ROWS = 1
+# the parts of a note a card shows, a change to any of them re-binds the card
+CARD_FIELDS = ("uuid", "title", "file", "created", "type")
+
+
 class NotePreviewerContainer(QScrollArea):
+    """
+    the grid of note cards. only the cards on screen (plus OVERSCAN_ROWS
+    above and below) exist as widgets; scrolling re-binds the same few
+    cards to different notes instead of building one card per note.
+
+    preview snippets are loaded in the background by a PreviewPopulator,
+    cards show a placeholder until theirs arrives.
+    """
 
     noteSelected = Signal(str)
     noteCreated = Signal(str, QFrame)
+    # every preview snippet has been loaded
+    populationFinished = Signal()
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, *kwargs)
 
-        self.notes = []
+        self.base_path = ""
+        # every note in the grid, in display order
+        self.records = []
+        # index into records -> the card showing it
+        self.cards = {}
+        # cards that aren't showing anything right now
+        self.pool = []
+        # uuids of notes saved since the home page was last shown
+        self.modified = set()
+        # uuid -> preview snippet, filled in by the populator
+        self.snippets = {}
+        # uuids already asked for ahead of the rest
+        self.prioritized = set()
+        # uuids of changed notes whose snippet is being re-read through the
+        # io service, the populator stays away from them
+        self.refreshing = set()
+        # layout_cards() is running, and whether it has to go again
+        self.laying_out = False
+        self.layout_again = False
+
+        self.populator = PreviewPopulator(parent=self)
+        self.populator.loaded.connect(self.apply_snippets)
+        self.populator.finished.connect(self.populationFinished.emit)
 
         self.setFrameShape(QFrame.Shape.NoFrame)
         self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
-        self.setWidgetResizable(True)
+        self.setWidgetResizable(False)
         self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
         self.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
 
-        self.main_widget = QFrame()
-        self.main_layout = FlowLayout(self.main_widget)
-        self.main_widget.setLayout(self.main_layout)
-        self.main_layout.setSpacing(25)
+        self.main_widget = NoteCanvas()
         self.setWidget(self.main_widget)
 
+        # same gaps the old flow layout ended up with
+        self.spacing_x = CARD_SPACING + self.style().layoutSpacing(
+            QSizePolicy.ControlType.PushButton,
+            QSizePolicy.ControlType.PushButton,
+            Qt.Orientation.Horizontal,
+        )
+        self.spacing_y = CARD_SPACING + self.style().layoutSpacing(
+            QSizePolicy.ControlType.PushButton,
+            QSizePolicy.ControlType.PushButton,
+            Qt.Orientation.Vertical,
+        )
+
+        self.verticalScrollBar().valueChanged.connect(self.layout_cards)
+
+    @property
+    def notes(self) -> list:
+        """
+        the cards currently bound to a note
+        """
+        return [self.cards[index] for index in sorted(self.cards)]
+
     def update_notes(self):
         for note in self.notes:
             note.redo_config_things()
 
+    def mark_modified(self, uuid: str):
+        """
+        remembers that a note's text changed, for refresh_modified()
+        """
+        self.modified.add(uuid)
+
+    def refresh_modified(self):
+        """
+        re-reads the preview of every note that changed. the reads go
+        through the io service, so they wait for the note's save, and the
+        populator starts over without those notes, so a batch that read
+        one before the save can't bring the old text back.
+        """
+        if not self.modified:
+            return
+
+        for note in self.records:
+            uuid = note["uuid"]
+            if uuid not in self.modified:
+                continue
+
+            self.snippets.pop(uuid, None)
+            self.refreshing.add(uuid)
+            get_io_service().submit(
+                uuid,
+                get_preview_cache().snippet,
+                note,
+                callback=lambda snippet, uuid=uuid: self.snippet_refreshed(
+                    uuid, snippet
+                ),
+                errback=lambda error, uuid=uuid: self.snippet_not_refreshed(
+                    uuid, error
+                ),
+            )
+        self.modified.clear()
+
+        self.populate()
+
+    def snippet_refreshed(self, uuid: str, snippet: str):
+        self.refreshing.discard(uuid)
+        self.apply_snippets([(uuid, snippet)])
+
+    def snippet_not_refreshed(self, uuid: str, error):
+        self.refreshing.discard(uuid)
+        # deleted since, the page reloads anyway
+        if not isinstance(error, FileNotFoundError):
+            raise error
+
+    def populate(self):
+        """
+        starts loading every snippet that isn't loaded yet, the ones in
+        the viewport first
+        """
+        visible = self.visible_range()
+        order = [self.records[index] for index in visible]
+        order += [
+            note for index, note in enumerate(self.records) if index not in visible
+        ]
+        order = [
+            note
+            for note in order
+            if note["uuid"] not in self.snippets and note["uuid"] not in self.refreshing
+        ]
+
+        self.prioritized = {self.records[index]["uuid"] for index in visible}
+        self.prioritized |= self.refreshing
+        self.populator.batch_size = file_management.get_settings().get(
+            "preview_batch_size", DEFAULT_BATCH_SIZE
+        )
+        self.populator.start(order)
+
+    def apply_snippets(self, results: list):
+        """
+        takes a chunk of (uuid, snippet) pairs from the populator
+        """
+        cards = {card.uuid: card for card in self.cards.values()}
+        for uuid, snippet in results:
+            self.snippets[uuid] = snippet
+            if uuid in cards:
+                cards[uuid].set_preview(snippet)
+
     def load_notes(self, base_path):
+        self.base_path = base_path
+        self.records = list(file_management.get_notes_in_config())
+
+        positions = {note["uuid"]: index for index, note in enumerate(self.records)}
+        get_preview_cache().prune(set(positions))
+        self.snippets = {
+            uuid: snippet
+            for uuid, snippet in self.snippets.items()
+            if uuid in positions
+        }
+
+        # cards follow their note to its new spot, only cards whose note
+        # is gone get released. layout_cards() then re-binds just the
+        # cards whose note actually changed.
+        cards = self.cards
+        self.cards = {}
+        for card in cards.values():
+            index = positions.get(card.uuid)
+            if index is None:
+                card.unbind()
+                self.pool.append(card)
+            else:
+                self.cards[index] = card
+
+        self.populate()
+        self.layout_cards()
+
+    def reload_notes(self):
+        self.load_notes(self.base_path)
+
+    def column_count(self, width: int) -> int:
+        return max(1, (width - 1 - CARD_WIDTH) // (CARD_WIDTH + self.spacing_x) + 1)
+
+    def card_position(self, index: int, columns: int) -> QPoint:
+        row, column = divmod(index, columns)
+        return QPoint(
+            column * (CARD_WIDTH + self.spacing_x),
+            row * (CARD_HEIGHT + self.spacing_y),
+        )
+
+    def visible_range(self) -> range:
+        """
+        indices of the notes in (or near) the viewport
+        """
+        columns = self.column_count(self.viewport().width())
+        rows = -(-len(self.records) // columns)
+        row_height = CARD_HEIGHT + self.spacing_y
+
+        top = self.verticalScrollBar().value()
+        first_row = max(0, top // row_height - OVERSCAN_ROWS)
+        last_row = min(
+            rows, (top + self.viewport().height()) // row_height + 1 + OVERSCAN_ROWS
+        )
+        return range(first_row * columns, min(len(self.records), last_row * columns))
+
+    def layout_cards(self):
+        """
+        sizes the canvas for every note, then makes sure exactly the
+        notes in (or near) the viewport have a card
+        """
+        # hiding or moving cards can scroll the view, which lands back
+        # here halfway through. that pass has an old idea of what's
+        # visible, so it finishes first and then everything goes again.
+        if self.laying_out:
+            self.layout_again = True
+            return
+
+        self.laying_out = True
+        try:
+            self.layout_again = True
+            while self.layout_again:
+                self.layout_again = False
+                self.place_cards()
+        finally:
+            self.laying_out = False
+
+    def place_cards(self):
+        width = self.viewport().width()
+        height = self.viewport().height()
+        columns = self.column_count(width)
+        rows = -(-len(self.records) // columns)
+        row_height = CARD_HEIGHT + self.spacing_y
+
+        self.main_widget.resize(width, max(height, rows * row_height))
+
+        visible = self.visible_range()
+        missing = []
+        # shadows are painted by the canvas, so it has to know when
+        # cards went somewhere else
+        moved = False
+
+        for index in [index for index in self.cards if index not in visible]:
+            self.release_card(index)
+            moved = True
+
+        for index in visible:
+            note = self.records[index]
+            card = self.cards.get(index)
+            if card is None:
+                card = self.cards[index] = self.take_card()
+
+            if card.note is not note:
+                if card.shows(note):
+                    card.note = note
+                    card.redo_config_things()
+                else:
+                    card.bind(self.base_path, note, self.snippets.get(note["uuid"]))
+                    self.noteCreated.emit(card.uuid, card)
+
+            uuid = note["uuid"]
+            if uuid not in self.snippets and uuid not in self.prioritized:
+                missing.append(note)
+                self.prioritized.add(uuid)
+
+            position = self.card_position(index, columns)
+            if card.pos() != position or card.isHidden():
+                card.move(position)
+                card.show()
+                moved = True
+
+        if moved:
+            self.main_widget.update()
+
+        # scrolled somewhere the populator hasn't gotten to yet
+        self.populator.load_now(missing)
+
+    def take_card(self):
+        if self.pool:
+            return self.pool.pop()
+
+        card = NotePreview(self.main_widget)
+        card.noteSelected.connect(self.noteSelected.emit)
+        card.noteDeleted.connect(self.reload_notes)
+        return card
+
+    def release_card(self, index: int):
+        card = self.cards.pop(index)
+        card.unbind()
+        self.pool.append(card)
+
+    def resizeEvent(self, event: QResizeEvent, /) -> None:
+        super().resizeEvent(event)
+        self.layout_cards()
 
-        while (child := self.main_layout.takeAt(0)) != None:
-            child.widget().hide()
 
-        notes = file_management.get_notes_in_config()
+class NoteCanvas(QFrame):
+    """
+    what the cards sit on. it paints their shadows, all from one cached
+    pixmap, instead of every card blurring its own.
+    """
 
-        for note in notes:
-            preview = NotePreview(base_path, note)
-            self.noteCreated.emit(preview.uuid, preview)
-            preview.noteSelected.connect(self.noteSelected.emit)
-            preview.noteDeleted.connect(lambda b=base_path: self.load_notes(b))
-            self.notes.append(preview)
-            self.main_layout.addWidget(preview)
+    def paintEvent(self, event: QPaintEvent, /) -> None:
+        super().paintEvent(event)
+
+        pixmap = shadow_pixmap(QSize(CARD_WIDTH, CARD_HEIGHT), CARD_RADIUS)
+        painter = QPainter(self)
+        for card in self.children():
+            if isinstance(card, NotePreview) and not card.isHidden():
+                rect = card.shadow_rect()
+                if rect.intersects(event.rect()):
+                    painter.drawPixmap(rect.topLeft(), pixmap)
+        painter.end()
 
 
 class NotePreview(QFrame):
+    """
+    a single card on the home page. cards get reused for other notes as
+    the grid scrolls, see bind() and unbind().
+    """
 
     noteSelected = Signal(str)
     noteDeleted = Signal()
 
-    def __init__(self, base_path, note, *args, **kwargs):
+    def __init__(self, *args, **kwargs):
         super().__init__(*args, *kwargs)
 
-        self.base_path = base_path
-        self.note = note
-        self.path = f"{self.base_path}{self.note['file']}"
+        self.base_path = ""
+        self.note = None
+        self.path = ""
 
-        self.note_title = self.note["title"]
-        self.note_date = self.note["created"]
-        self.edited_date = self.note["edited"]
-        self.uuid = self.note["uuid"]
+        self.note_title = ""
+        self.note_date = ""
+        self.edited_date = ""
+        self.uuid = ""
 
         self.setCursor(Qt.CursorShape.PointingHandCursor)
         self.setObjectName("note-preview")
@@ -139,13 +441,10 @@ class NotePreview(QFrame):
             }
             """
         )
-        self.setFixedSize(382, 200)
+        self.setFixedSize(CARD_WIDTH, CARD_HEIGHT)
 
-        self.shadow = QGraphicsDropShadowEffect(self)
-        self.shadow.setBlurRadius(20)
-        self.shadow.setOffset(5, 5)
-        self.shadow.setColor(QColor(255, 255, 255, 50))
-        self.setGraphicsEffect(self.shadow)
+        # the canvas draws the shadow, this is just where
+        self.shadow_offset = SHADOW_OFFSET
 
         self.main_layout = QVBoxLayout(self)
         self.setLayout(self.main_layout)
@@ -174,7 +473,8 @@ class NotePreview(QFrame):
             """
         )
 
-        self.path_text = file_management.get_text_in_file(self.note['file'])
+        # filled in by set_preview once the container has the snippet
+        self.path_text = ""
 
         self.path_label = QLabel(self.path_text)
         self.path_label.setSizePolicy(
@@ -196,30 +496,20 @@ class NotePreview(QFrame):
         )
         self.info_section_layout = QHBoxLayout(self.info_section)
         self.main_layout.addWidget(self.info_section)
+        self.info_section.setObjectName("info-section")
+        self.info_section.setStyleSheet(theme.CARD_INFO_SECTION)
 
         self.icon_label = QPushButton("", self)
 
-        if self.note['type'] == "plain":
-            self.icon = QIcon("/home/zach/Desktop/icons/draft.svg")
-        else:
-            self.icon = QIcon("/home/zach/Desktop/icons/light_markdown.svg")
-        self.icon_label.setIcon(self.icon)
+        self.plain_icon = get_icon("draft")
+        self.markdown_icon = get_icon("light_markdown")
         self.icon_label.setIconSize(QSize(32, 32))
         self.info_section_layout.addWidget(self.icon_label)
 
-        self.note_title_label = EllipsisLabel(f"{self.note_title}", self.info_section)
+        self.note_title_label = EllipsisLabel("", self.info_section)
         self.info_section_layout.addWidget(self.note_title_label, stretch=1)
 
-        dt = [int(a) for a in self.note_date.split("-")]
-        self.datetime = QDateTime(*dt)
-        string = self.datetime.toString()
-        string = string[:3] + ", " + string[4:]
-        string = string[:11] + "\n" + string[12:]
-        # string = string[:21] + "\n" + string[22:]
-        self.note_date_label = QLabel(
-            f"{string}",
-            self.info_section,
-        )
+        self.note_date_label = QLabel("", self.info_section)
         self.note_date_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.info_section_layout.addWidget(
             self.note_date_label, alignment=Qt.AlignmentFlag.AlignRight
@@ -232,17 +522,79 @@ class NotePreview(QFrame):
         self.main_layout.setStretch(1, 30)
 
         self.info_thing = InfoButton(self)
-        self.info_thing.move(382 - 20 - 25 - 10, 0 + 10)
+        self.info_thing.move(CARD_WIDTH - 20 - 25 - 10, 0 + 10)
         self.info_thing.raise_()
         self.info_thing.clicked.connect(self.open_info)
 
         # the three dots
         self.three_dots_thing = ThreeDots(self)
-        self.three_dots_thing.move(382 - 20 - 10, 0 + 10)
+        self.three_dots_thing.move(CARD_WIDTH - 20 - 10, 0 + 10)
         self.three_dots_thing.raise_()
         self.three_dots_thing.clicked.connect(self.open_menu)
 
-        self.set_infosection_stylesheet("#303030")
+        # cards are clicked, not tabbed to. a button with the focus makes
+        # qt hand it to another widget (and scroll to it) when the card hides
+        for button in [self.icon_label, self.info_thing, self.three_dots_thing]:
+            button.setFocusPolicy(Qt.FocusPolicy.NoFocus)
+
+    def bind(self, base_path, note, snippet=None):
+        """
+        points the card at a (different) note. without a snippet the
+        preview stays empty until set_preview() gets called.
+        """
+        self.base_path = base_path
+        self.note = note
+        self.path = f"{self.base_path}{self.note['file']}"
+
+        self.note_title = self.note["title"]
+        self.note_date = self.note["created"]
+        self.edited_date = self.note["edited"]
+        self.uuid = self.note["uuid"]
+
+        if self.note['type'] == "plain":
+            self.icon = self.plain_icon
+        else:
+            self.icon = self.markdown_icon
+        self.icon_label.setIcon(self.icon)
+
+        self.note_title_label.setText(f"{self.note_title}")
+
+        dt = [int(a) for a in self.note_date.split("-")]
+        self.datetime = QDateTime(*dt)
+        string = self.datetime.toString()
+        string = string[:3] + ", " + string[4:]
+        string = string[:11] + "\n" + string[12:]
+        # string = string[:21] + "\n" + string[22:]
+        self.note_date_label.setText(f"{string}")
+
+        self.set_preview(snippet or "")
+
+    def shows(self, note) -> bool:
+        """
+        whether the card already shows everything of note there is to show
+        """
+        return self.note is not None and all(
+            self.note[field] == note[field] for field in CARD_FIELDS
+        )
+
+    def unbind(self):
+        """
+        takes the card off screen, ready to be bound to another note
+        """
+        # hiding it with the focus inside would pass the focus on
+        focused = QApplication.focusWidget()
+        if focused is not None and self.isAncestorOf(focused):
+            focused.clearFocus()
+        self.hide()
+        self.note = None
+
+        # it may never get the leave event
+        self.set_hovered(False)
+        self.set_shadow_offset(SHADOW_OFFSET)
+
+    def set_preview(self, text):
+        self.path_text = text
+        self.path_label.setText(text)
 
     def redo_config_things(self):
         self.base_path = file_management.get_base_path()
@@ -253,48 +605,37 @@ class NotePreview(QFrame):
         self.edited_date = self.note["edited"]
         self.uuid = self.note["uuid"]
 
-    def set_infosection_stylesheet(self, color):
-        self.info_section.setStyleSheet(
-            f"""
-            background-color: {color};
-            color: white;
-            border-top-left-radius: 0px;
-            border-top-right-radius: 0px;
-            """
-        )
-
-    def redo_preview(self):
-        self.redo_config_things
-        try:
-            self.path_label.setText(
-                file_management.get_text_in_file(
-                    self.note['file']
-                )
-            )
-        except FileNotFoundError:
-            """
-            bug where the class's config file and everythign relating
-            to it doesn't get updated in time. it's probably just something
-            ordered poorly somewhere, or a race.
-            this is a hacky solution, but there are plans to make it possible
-            to have an "invalid" note.
-            """
-            pass
+    def set_hovered(self, hovered):
+        theme.set_state(self.info_section, "hovered", hovered)
 
     def mousePressEvent(self, event: QMouseEvent, /) -> None:
         self.noteSelected.emit(f"{self.uuid}")
         return super().mousePressEvent(event)
 
+    def shadow_rect(self) -> QRect:
+        """
+        where the canvas draws this card's shadow
+        """
+        return QRect(
+            self.pos() + self.shadow_offset + shadow_margin(),
+            shadow_pixmap(QSize(CARD_WIDTH, CARD_HEIGHT), CARD_RADIUS).size(),
+        )
+
+    def set_shadow_offset(self, offset: QPoint):
+        old = self.shadow_rect()
+        self.shadow_offset = offset
+        if self.parentWidget():
+            # only the shadow's own patch of the canvas gets repainted
+            self.parentWidget().update(old.united(self.shadow_rect()))
+
     def enterEvent(self, event: QEnterEvent, /) -> None:
-        self.set_infosection_stylesheet("#404040")
-        self.shadow.setOffset(10, 10)
-        self.setGraphicsEffect(self.shadow)
+        self.set_hovered(True)
+        self.set_shadow_offset(HOVER_SHADOW_OFFSET)
         return super().enterEvent(event)
 
     def leaveEvent(self, event: QEvent, /) -> None:
-        self.set_infosection_stylesheet("#303030")
-        self.shadow.setOffset(5, 5)
-        self.setGraphicsEffect(self.shadow)
+        self.set_hovered(False)
+        self.set_shadow_offset(SHADOW_OFFSET)
         return super().leaveEvent(event)
 
     def open_menu(self):
@@ -308,18 +649,34 @@ class NotePreview(QFrame):
         menu.exec(pos)
 
     def delete_note(self):
-        data = file_management.get_config()
+        if note := file_management.remove_note(self.uuid):
+            # anything still queued for this note is pointless now
+            get_io_service().cancel(self.uuid)
+            get_preview_cache().forget(self.uuid)
+            # the note is out of the config already, so its path comes
+            # from the removed record. the page reloads once the file is
+            # gone, with front matter the file is where the note is listed.
+            get_io_service().submit(
+                self.uuid,
+                journal.delete_note,
+                note,
+                callback=self.file_deleted,
+                errback=self.file_not_deleted,
+            )
 
-        for i, note in enumerate(data["notes"]):
-            if note["uuid"] == self.uuid:
-                data["notes"].pop(i)
-                os.remove(f"{data['base_path']}{note['file']}")
+        self.redo_config_things()
 
-        file_management.write_json(data)
+        if not note:
+            self.noteDeleted.emit()
 
-        self.redo_config_things()
+    def file_deleted(self, result):
+        self.noteDeleted.emit()
 
+    def file_not_deleted(self, error):
         self.noteDeleted.emit()
+        # already gone is what we wanted anyway
+        if not isinstance(error, FileNotFoundError):
+            raise error
 
     def duplicate_note(self):
         print("duplicating note")
@@ -411,7 +768,7 @@ class ThreeDots(QPushButton):
             """
         )
         siz = 20
-        self.light = QIcon("/home/zach/Desktop/icons/light_more_vert.svg")
+        self.light = get_icon("light_more_vert")
         self.setFixedSize(siz, siz)
         self.setIconSize(QSize(siz, siz))
         self.setIcon(self.light)
@@ -428,7 +785,7 @@ class InfoButton(QPushButton):
             """
         )
         siz = 20
-        self.light = QIcon("/home/zach/Desktop/icons/light_info.svg")
+        self.light = get_icon("light_info")
         self.setFixedSize(siz, siz)
         self.setIconSize(QSize(siz, siz))
         self.setIcon(self.light)
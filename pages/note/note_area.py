@@ -1,12 +1,27 @@
 from PySide6.QtCore import *
 from PySide6.QtGui import *
 from PySide6.QtWidgets import *
+import os
 from other import file_management
+from other import journal
+from other.autosave import DEFAULT_DELAY, AutosaveScheduler, content_hash
+from other.io_service import get_io_service
+from other.journal import NoteJournal, utf16_length
+from other.swap import SWAP_INTERVAL, SwapFile
+
+# space between the line numbers and the edges of their gutter
+LINE_NUMBER_PADDING = 5
+LINE_NUMBER_COLOR = QColor("white")
+# relative line numbers, all but the current line's
+RELATIVE_NUMBER_COLOR = QColor("#7aa2f7")
+GUTTER_BACKGROUND = QColor("#1e1e1e")
 
 class NoteArea(QFrame):
 
     updateBottomBar = Signal(str, object)
     saved = Signal()
+    # the note's text is in the editor
+    loaded = Signal()
 
     def __init__(self, config, uuid, *args, **kwargs):
         super().__init__(*args, *kwargs)
@@ -40,6 +55,29 @@ class NoteArea(QFrame):
         self.main_layout.addWidget(self.input_area)
 
         self.markdown_viewer = None
+        self.journal = None
+        self.recorder = None
+        # an append to the journal failed, the next save has to be a full one
+        self.journal_failed = False
+        self.swap = None
+        self.swap_recorder = None
+        # edits that were recovered from a swap file when the note loaded
+        self.recovered = []
+        self.autosave = None
+        # {"hash": ...} of the note file's own text (no journal), to skip
+        # saves that wouldn't change the file. only the note's io requests
+        # touch it, and they run in order, so every save compares against
+        # what the save before it left on disk, even if that one was still
+        # queued when this one got submitted.
+        self.written = {"hash": None}
+
+        # unsaved edits get written to the swap file in batches,
+        # SWAP_INTERVAL after the first edit since the last flush
+        self.swap_timer = QTimer(self)
+        self.swap_timer.setSingleShot(True)
+        self.swap_timer.setInterval(SWAP_INTERVAL)
+        self.swap_timer.timeout.connect(self.flush_swap)
+
         self.load_files()
 
     def refresh_upon_switch(self):
@@ -53,15 +91,152 @@ class NoteArea(QFrame):
 
         self.input_area.load_line_numbers()
 
+        if self.autosave:
+            self.autosave.set_delay(self.load_autosave_delay())
+
         if self.markdown_viewer:
             self.markdown_viewer.setFont(self.load_font())
 
 
     def load_files(self):
+        """
+        starts reading the note in the background, the editor gets filled
+        in (and loaded is emitted) once that's done
+        """
         filename = file_management.get_note_by_uuid(self.uuid)['file']
-        with open(f"{self.config['base_path']}{filename}", "r") as f:
-            text = f.read()
-            self.input.setText(text)
+
+        # a journal left over from journal mode still has to be applied,
+        # even if journal mode has been turned off since
+        self.journal = NoteJournal(filename)
+        self.swap = SwapFile(filename)
+
+        self.input.setReadOnly(True)
+        self.load_request = get_io_service().submit(
+            self.uuid, self.read_note, callback=self.note_read
+        )
+
+    def read_note(self) -> tuple[str, list]:
+        """
+        runs on an io thread. returns the saved text (journal included)
+        and any edits left behind in a swap file
+        """
+        # let any journal writes or compaction still queued for the last
+        # session with this note finish first
+        journal.worker.submit(lambda: None).result()
+
+        # the hash is of the file without the journal. a full save whose
+        # text matches the journaled text still has to write the file,
+        # since the journal gets discarded after it.
+        text = file_management.get_text_in_file(self.journal.filename)
+        self.written["hash"] = content_hash(text)
+        text = self.journal.replay(text)
+        return text, self.swap.recover(text)
+
+    def note_read(self, result: tuple[str, list]):
+        text, self.recovered = result
+
+        self.swap.start(text)
+        if self.recovered and not self.ask_to_recover():
+            self.recovered = []
+            self.swap.clear()
+
+        # the journal and swap positions have to line up with the file
+        # character for character, so don't let qt guess whether it's rich text
+        self.input.setPlainText(journal.apply(text, self.recovered))
+        self.input.setReadOnly(False)
+
+        document = self.input.document()
+        self.swap_recorder = DeltaRecorder(document, self)
+        document.contentsChange.connect(self.schedule_swap)
+
+        if self.config['settings'].get('journal_saves', False):
+            self.recorder = DeltaRecorder(document, self)
+            # the recovered edits aren't in the journal yet either
+            self.recorder.deltas.extend(self.recovered)
+
+        if self.recovered:
+            document.setModified(True)
+
+        self.autosave = AutosaveScheduler(document, self.load_autosave_delay(), self)
+        self.autosave.saveRequested.connect(self.saved.emit)
+
+        self.loaded.emit()
+
+    def close_note(self):
+        """
+        the note is being closed, stop anything that would still touch it
+        """
+        self.load_request.cancel()
+        self.swap_timer.stop()
+        if self.autosave:
+            self.autosave.stop()
+
+    def load_autosave_delay(self) -> int:
+        return self.config['settings'].get('autosave_delay', DEFAULT_DELAY)
+
+    def is_dirty(self) -> bool:
+        # still loading, nothing to save yet
+        if not self.autosave:
+            return False
+        return self.autosave.is_dirty()
+
+    def mark_saved(self):
+        """
+        the note on disk matches the editor now
+        """
+        self.input.document().setModified(False)
+
+    def ask_to_recover(self) -> bool:
+        answer = QMessageBox.question(
+            self,
+            "Recover Note",
+            "This note has unsaved changes from a session that didn't close "
+            "properly. Recover them?",
+        )
+        return answer == QMessageBox.StandardButton.Yes
+
+    def schedule_swap(self, *args):
+        if not self.swap_timer.isActive():
+            self.swap_timer.start()
+
+    def flush_swap(self):
+        """
+        writes the unsaved edits so far to the swap file (in the background)
+        """
+        if deltas := self.swap_recorder.take():
+            self.swap.append(deltas)
+
+    def clear_swap(self, after=None):
+        """
+        everything is saved, so the swap file isn't needed anymore.
+        after is the future of the save, if it's still being written.
+        """
+        self.swap_timer.stop()
+        if self.swap_recorder:
+            self.swap_recorder.take()
+        self.swap.clear(after)
+
+    def save_journal(self):
+        """
+        appends the edits since the last save to the journal (journal mode).
+        returns the future of the append, which says whether it wrote anything.
+        """
+        future = self.journal.append(self.recorder.take(), self.input.toPlainText())
+        self.clear_swap(future)
+        return future
+
+    def saved_in_full(self, after=None):
+        """
+        the whole note is being written, so an old journal is obsolete.
+        after is the future of that write.
+        """
+        if self.recorder:
+            # the whole text has the edits that were waiting for the journal
+            self.recorder.take()
+            self.journal_failed = False
+        if self.recorder or os.path.exists(self.journal.path):
+            self.journal.discard(after)
+        self.clear_swap(after)
 
     def load_font(self):
         font_size = self.config['settings']['font_size']
@@ -85,6 +260,48 @@ class NoteArea(QFrame):
             )
             self.main_layout.insertWidget(1, self.markdown_viewer)
 
+class DeltaRecorder(QObject):
+    """
+    collects the edits made to a document as (position, removed, inserted),
+    which is what the journal stores
+    """
+
+    def __init__(self, document: QTextDocument, *args, **kwargs):
+        super().__init__(*args, *kwargs)
+
+        self.document = document
+        self.deltas = []
+
+        self.document.contentsChange.connect(self.record)
+
+    def record(self, position, removed, added):
+        # qt sometimes counts the document's trailing paragraph separator
+        # in both removed and added, even though it never changes
+        end = min(position + added, self.document.characterCount() - 1)
+        removed = max(removed - (position + added - end), 0)
+
+        cursor = QTextCursor(self.document)
+        cursor.setPosition(position)
+        cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+        inserted = cursor.selectedText().replace("\u2029", "\n")
+
+        if not removed and not inserted:
+            return
+
+        # typing produces one edit per key, glue them back together
+        if self.deltas and not removed:
+            last_position, last_removed, last_inserted = self.deltas[-1]
+            if position == last_position + utf16_length(last_inserted):
+                self.deltas[-1] = (last_position, last_removed, last_inserted + inserted)
+                return
+
+        self.deltas.append((position, removed, inserted))
+
+    def take(self) -> list:
+        deltas, self.deltas = self.deltas, []
+        return deltas
+
+
 class MarkdownViewer(QTextEdit):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, *kwargs)
@@ -120,7 +337,7 @@ class InputArea(QFrame):
             QFrame{
                 background-color: #1e1e1e;
             }
-            QTextEdit{
+            QPlainTextEdit{
                 background-color: #1e1e1e;
                 color: white;
             }
@@ -128,8 +345,6 @@ class InputArea(QFrame):
         )
 
         self.config = config
-        # keeps track of the amount of lines
-        self.current_line_count = -1
 
         self.main_layout = QHBoxLayout(self)
         self.setLayout(self.main_layout)
@@ -140,50 +355,22 @@ class InputArea(QFrame):
         )
 
         # the actual input stuff
+        # notes (and markdown source) are plain text, so this doesn't pay
+        # for rich text. its layout only ever lays out the blocks on screen,
+        # which keeps long notes fast to load and type in.
         # the event filter is to catch the undo / redo without having
         # to manually do it myself
-        self.input = QTextEdit(self)
+        self.input = QPlainTextEdit(self)
         self.input.installEventFilter(self)
 
-        self.input.verticalScrollBar().valueChanged.connect(self.match_scrollbars)
-
-        # the scroll area for the line numbers
-        self.ln_scroll = QScrollArea()
-        self.ln_scroll.setWidgetResizable(True)
-
-        self.ln_scroll.setStyleSheet("background-color: #1e1e1e; color: white;")
-        self.ln_scroll.setMinimumWidth(25)
-        self.ln_scroll.setSizePolicy(
-            QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Expanding
+        # the line numbers, painted next to the input
+        self.line_numbers = LineNumberArea(
+            self.input, self.config['settings']['relative_line_numbers']
         )
-        self.ln_scroll.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.ln_scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-
-        # the widget and layout for the scroll area
-        self.ln_widget = QFrame()
-        self.ln_layout = QVBoxLayout(self.ln_widget)
-
-        self.ln_widget.setLayout(self.ln_layout)
-        self.ln_widget.setStyleSheet("background-color: #1e1e1e;")
-        self.ln_widget.setSizePolicy(
-            QSizePolicy.Policy.Minimum, QSizePolicy.Policy.Expanding
-        )
-        self.ln_layout.setSpacing(0)
-
-        self.ln_scroll.setWidget(self.ln_widget)
-
-        # signals
-        if not self.config['settings']['relative_line_numbers']:
-            self.input.cursorPositionChanged.connect(self.update_line_numbers)
-            self.input.cursorPositionChanged.connect(self.update_text_position)
-            self.ln_layout.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignHCenter)
-        else:
-            self.ln_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
-            self.input.cursorPositionChanged.connect(self.update_relative_line_numbers)
-            self.input.cursorPositionChanged.connect(self.update_text_position)
+        self.input.cursorPositionChanged.connect(self.update_text_position)
 
         # finishing the visual
-        self.main_layout.addWidget(self.ln_scroll)
+        self.main_layout.addWidget(self.line_numbers)
         self.main_layout.addWidget(self.input)
 
         # default shortcuts
@@ -199,22 +386,22 @@ class InputArea(QFrame):
             ["Ctrl+Y", lambda: self.line_operations("yank")],
             # delete line
             ["Ctrl+D", lambda: self.line_operations("delete")],
+            # move line
+            ["Alt+K", lambda: self.line_operations("up")],
+            ["Alt+J", lambda: self.line_operations("down")],
+            # duplicate line
+            ["Ctrl+Shift+Y", lambda: self.line_operations("duplicate")],
         ]
 
         self.load_font()
-        self.update_line_numbers()
         self.load_tab_length()
         self.load_shortcuts()
 
     def update_text_position(self):
+        # every line is a block, so this never has to look at the text
         cursor = self.input.textCursor()
-        pos = cursor.position()
-
-        text_before = self.input.toPlainText()[:pos]
-        lines = text_before.split("\n")
-
-        line_number = len(lines)
-        column_number = len(lines[-1])
+        line_number = cursor.blockNumber() + 1
+        column_number = cursor.positionInBlock()
 
         self.updateBottomBar.emit("cursor", [line_number, column_number])
 
@@ -240,11 +427,19 @@ class InputArea(QFrame):
 
 
     def line_operations(self, operation):
+        """
+        does operation to the line the cursor is on, as one undo step.
+        only that line (and the one it swaps with) gets touched, however
+        long the note is.
+        """
         cursor = self.input.textCursor()
 
-        line_number = cursor.blockNumber()
-        text = self.input.toPlainText().split("\n")
-        line = text[line_number]
+        block = cursor.block()
+        line = block.text()
+        column = cursor.positionInBlock()
+        # where the line starts and ends, positions are in utf-16 like qt's
+        start = block.position()
+        end = start + block.length() - 1
 
         match operation:
             case "yank":
@@ -254,34 +449,81 @@ class InputArea(QFrame):
                 self.updateBottomBar.emit(
                     "action", f"Yanked {len(line)} characters"
                 )
+                return
             case "delete":
-                # find, remove, and set the new text
-                chars = len(text[line_number])
-                text.pop(line_number)
-                new_text = "\n".join(text)
-                self.input.setText(new_text)
-
-                # reset back to 0
-                cursor.setPosition(0)
-
-                # move vertically
-                for _ in range(line_number -1):
-                    cursor.movePosition(
-                        cursor.MoveOperation.Down
-                    )
-
-                # move horizontally
-                cursor.movePosition(cursor.MoveOperation.EndOfLine)
+                # the line and the newline after it, or before it if it's
+                # the last line
+                if block.next().isValid():
+                    end += 1
+                elif block.previous().isValid():
+                    start -= 1
+
+                cursor.beginEditBlock()
+                cursor.setPosition(start)
+                cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+                cursor.removeSelectedText()
+                cursor.endEditBlock()
+
+                # same column on the line that took its place
+                self.move_to_column(cursor, column)
 
                 # update bottom bar
                 self.updateBottomBar.emit(
-                    "action", f"Deleted {chars} characters"
+                    "action", f"Deleted {len(line)} characters"
+                )
+            case "up" | "down":
+                other = block.previous() if operation == "up" else block.next()
+                if not other.isValid():
+                    return
+                other_line = other.text()
+                other_start = other.position()
+                other_end = other_start + other.length() - 1
+
+                # swap the two lines in one go
+                cursor.beginEditBlock()
+                if operation == "up":
+                    cursor.setPosition(other_start)
+                    cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+                    cursor.insertText(f"{line}\n{other_line}")
+                    line_start = other_start
+                else:
+                    cursor.setPosition(start)
+                    cursor.setPosition(other_end, QTextCursor.MoveMode.KeepAnchor)
+                    cursor.insertText(f"{other_line}\n{line}")
+                    line_start = start + utf16_length(other_line) + 1
+                cursor.endEditBlock()
+
+                # the line moved, the cursor goes with it
+                cursor.setPosition(line_start)
+                self.move_to_column(cursor, column)
+
+                self.updateBottomBar.emit("action", f"Moved line {operation}")
+            case "duplicate":
+                cursor.beginEditBlock()
+                cursor.setPosition(end)
+                cursor.insertText(f"\n{line}")
+                cursor.endEditBlock()
+
+                # onto the copy
+                cursor.setPosition(end + 1)
+                self.move_to_column(cursor, column)
+
+                self.updateBottomBar.emit(
+                    "action", f"Duplicated {len(line)} characters"
                 )
             case _:
                 pass
 
         self.input.setTextCursor(cursor)
 
+    def move_to_column(self, cursor, column):
+        """
+        moves cursor to column in its line, or the end of the line
+        if it's shorter than that
+        """
+        block = cursor.block()
+        cursor.setPosition(block.position() + min(column, block.length() - 1))
+
     def move_character(self, direction):
         cursor = self.input.textCursor()
 
@@ -317,75 +559,115 @@ class InputArea(QFrame):
         font_size = self.config['settings']['font_size']
         self.main_font = QFont("Jetbrains Mono", font_size)
         self.input.setFont(self.main_font)
-
-        for child in self.ln_widget.children():
-            if isinstance(child, QLabel):
-                child.setFont(self.main_font)
+        self.line_numbers.setFont(self.main_font)
 
     def load_line_numbers(self):
-        self.input.cursorPositionChanged.disconnect()
-
-        if not self.config['settings']['relative_line_numbers']:
-            self.input.cursorPositionChanged.connect(self.update_line_numbers)
-            self.input.cursorPositionChanged.connect(self.update_text_position)
-            self.ln_layout.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignHCenter)
-            self.update_line_numbers()
-        else:
-            self.ln_layout.setAlignment(Qt.AlignmentFlag.AlignTop)
-            self.input.cursorPositionChanged.connect(self.update_relative_line_numbers)
-            self.input.cursorPositionChanged.connect(self.update_text_position)
-            self.update_relative_line_numbers()
-
-
-    def update_line_numbers(self):
-        """
-        updates the amount of line numbers according to the actual amount
-        there is.
-        """
-        numbers = self.input.document().blockCount()
-
-        if self.current_line_count != numbers:
+        self.line_numbers.set_relative(
+            self.config['settings']['relative_line_numbers']
+        )
 
-            while (child := self.ln_layout.takeAt(0)) != None:
-                if child.widget() and isinstance(child.widget(), QLabel):
-                    child.widget().deleteLater()
 
-            for i in range(numbers):
-                l = QLabel(f"{i + 1}")
-                l.setFont(self.main_font)
-                l.setAlignment(Qt.AlignmentFlag.AlignRight)
-                self.ln_layout.addWidget(l)
+class LineNumberArea(QWidget):
+    """
+    the line numbers next to an editor. they're painted straight from the
+    document's layout, and only for the blocks that are on screen, so a
+    long note costs the same as a short one.
 
-    def update_relative_line_numbers(self):
+    a block's number goes next to its first line, so wrapped lines get one
+    number. in relative mode, every block but the current one shows its
+    distance from the current one.
 
-        while (child := self.ln_layout.takeAt(0)) != None:
-            if child.widget() and isinstance(child.widget(), QLabel):
-                child.widget().deleteLater()
+    the numbers only depend on where the blocks are and (in relative mode)
+    which one the cursor is in, so that's all that repaints them. typing
+    inside a line or moving along it doesn't.
+    """
 
-        numbers = self.input.document().blockCount()
-        line_number = self.input.textCursor().blockNumber()
+    def __init__(self, editor: QPlainTextEdit, relative: bool = False, *args, **kwargs):
+        super().__init__(*args, *kwargs)
 
-        for i in range(numbers):
-            num = abs(i - line_number)
-            if num == 0:
-                num = line_number + 1
-                l = QLabel(f"{num}")
-                l.setStyleSheet(
-                    "color: white;"
+        self.editor = editor
+        self.relative = relative
+        self.setSizePolicy(QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Expanding)
+
+        # widest number there's room for, the width changes with the digits
+        self.digits = 0
+        # the block the cursor is in
+        self.current = editor.textCursor().blockNumber()
+
+        editor.verticalScrollBar().valueChanged.connect(self.update)
+        editor.cursorPositionChanged.connect(self.cursor_moved)
+        editor.document().blockCountChanged.connect(self.update_width)
+        # a line (un)wrapping moves every block after it, so does a relayout
+        # after a resize. both change the document's height.
+        editor.document().documentLayout().documentSizeChanged.connect(self.update)
+
+        self.update_width()
+
+    def set_relative(self, relative: bool):
+        self.relative = relative
+        self.update()
+
+    def cursor_moved(self):
+        current = self.editor.textCursor().blockNumber()
+        if current == self.current:
+            return
+
+        self.current = current
+        if self.relative:
+            self.update()
+
+    def update_width(self, *args):
+        digits = len(str(self.editor.document().blockCount()))
+        if digits != self.digits:
+            self.digits = digits
+            self.updateGeometry()
+        self.update()
+
+    def changeEvent(self, event: QEvent, /) -> None:
+        if event.type() == QEvent.Type.FontChange:
+            self.updateGeometry()
+        return super().changeEvent(event)
+
+    def sizeHint(self) -> QSize:
+        width = self.fontMetrics().horizontalAdvance("9") * max(self.digits, 2)
+        return QSize(width + LINE_NUMBER_PADDING * 2, 0)
+
+    def paintEvent(self, event: QPaintEvent, /) -> None:
+        painter = QPainter(self)
+        painter.fillRect(event.rect(), GUTTER_BACKGROUND)
+
+        viewport = self.editor.viewport()
+        offset = self.editor.contentOffset()
+        # where the top of the editor's viewport is in here
+        top = self.mapFromGlobal(viewport.mapToGlobal(QPoint(0, 0))).y()
+
+        current = self.current
+        line_height = self.fontMetrics().height()
+        width = self.width() - LINE_NUMBER_PADDING
+
+        block = self.editor.firstVisibleBlock()
+        while block.isValid():
+            y = top + self.editor.blockBoundingGeometry(block).translated(offset).top()
+            if y > min(viewport.height() + top, event.rect().bottom()):
+                break
+
+            if block.isVisible() and y + line_height >= event.rect().top():
+                number = block.blockNumber()
+                if self.relative and number != current:
+                    painter.setPen(RELATIVE_NUMBER_COLOR)
+                    text = str(abs(number - current))
+                else:
+                    painter.setPen(LINE_NUMBER_COLOR)
+                    text = str(number + 1)
 
+                # lined up with the block's first line
+                first_line = block.layout().lineAt(0)
+                if first_line.isValid():
+                    rect = QRectF(0, y + first_line.y(), width, first_line.height())
+                else:
+                    rect = QRectF(0, y, width, line_height)
+                painter.drawText(
+                    rect, Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter, text
                 )
-            else:
-                l = QLabel(f"{num}")
-                l.setStyleSheet(
-                    "color: #7aa2f7;"
-                )
-            l.setFont(self.main_font)
-            l.setAlignment(Qt.AlignmentFlag.AlignRight)
-            self.ln_layout.addWidget(l)
 
-    def match_scrollbars(self, value):
-        """
-        matches the scrollbars, so the line numbers scroll
-        accordingly to the scroll value of the actual input area
-        """
-        self.ln_scroll.verticalScrollBar().setValue(value)
+            block = block.next()
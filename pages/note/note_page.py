@@ -1,15 +1,52 @@
 from PySide6.QtCore import *
 from PySide6.QtGui import *
 from PySide6.QtWidgets import *
+from concurrent.futures import Future
 from datetime import datetime
 from other import file_management
+from other import journal
+from other.autosave import content_hash
+from other.icons import get_icon
+from other.io_service import get_io_service
 from pages.note.note_area import NoteArea
 from widgets.top_bar import TopBar
 
 
+def save_if_changed(uuid: str, text: str, written: dict, edited: str) -> dict:
+    """
+    runs on an io thread, in order with the note's other requests. writes
+    the note unless the text hashes the same as what's already in the note
+    file (written["hash"], which leaves any journal out), and keeps that
+    hash up to date. returns the note ({} if skipped).
+    """
+    text_hash = content_hash(text)
+
+    # edited and then changed back, the file is already right
+    if text_hash == written["hash"]:
+        return {}
+
+    note = file_management.save_note(uuid, text, edited)
+    written["hash"] = text_hash
+    return note
+
+
+def update_after(written: Future, uuid: str, edited: str) -> dict:
+    """
+    runs on the journal worker, right behind the append (written). the note
+    file gets its new date only once the edits are in the journal (and not
+    at all if the append was skipped), and a compaction can't be overwritten
+    by the header going in with the old body. returns the note ({} if skipped).
+    """
+    if not written.result():
+        return {}
+    return file_management.update_note(uuid, edited=edited)
+
+
 class NotePage(QFrame):
 
     backButton = Signal()
+    # uuid of a note whose text just got saved
+    noteModified = Signal(str)
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, *kwargs)
@@ -27,7 +64,7 @@ class NotePage(QFrame):
         self.top_bar = TopBar()
         self.top_bar.add_button(
             "back_button",
-            QIcon("/home/zach/Desktop/icons/light_arrow_back.svg"),
+            get_icon("light_arrow_back"),
             self.back
         )
         self.main_layout.addWidget(self.top_bar)
@@ -41,69 +78,130 @@ class NotePage(QFrame):
 
     def back(self):
         if self.note_container:
-            self.write_file()
+            # nothing should save (or load) behind the user's back
+            # on the home page
+            self.note_container.close_note()
+
+            if file_management.get_settings().get("save_on_file_exit", True):
+                self.write_file()
+            else:
+                # leaving without saving means the changes are thrown away
+                self.note_container.clear_swap()
 
         self.backButton.emit()
 
     # TODO: replace with file_management entirely
     def write_file(self):
         if self.note_container:
-            current = self.note_container.input.toPlainText()
-            file_management.write_to_file(self.current_file['file'], current)
+            if not self.note_container.is_dirty():
+                return
 
-            # update the file
-            for i, note in enumerate(notes := file_management.get_notes_in_config()):
-                if note["uuid"] == self.current_file['uuid']:
-                    current_date = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+            current_date = datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+            area = self.note_container
 
-                    self.update_bottom_bar("action", f"Saved {current_date}")
-                    note["edited"] = current_date
-                    notes[i] = note
-
-                    settings = file_management.get_config()
-                    settings['notes'] = notes
-                    file_management.write_json(settings)
+            if area.recorder and not area.journal_failed:
+                # journal mode, only the edits since the last save get written
+                written = area.save_journal()
+                updated = journal.worker.submit(
+                    update_after, written, self.current_file['uuid'], current_date
+                )
+                area.mark_saved()
+
+                # anything queued for the note after this (like a preview
+                # read) waits for the append and the header
+                get_io_service().submit(
+                    self.current_file['uuid'],
+                    updated.result,
+                    callback=self.file_written,
+                    errback=lambda error, area=area: self.journal_not_written(
+                        area, written, error
+                    ),
+                )
+                self.noteModified.emit(self.current_file['uuid'])
+            else:
+                if area.recorder:
+                    # compactions rewrote the file behind the hash's back
+                    area.written["hash"] = None
+
+                # hashing and writing happen on an io thread
+                request = get_io_service().submit(
+                    self.current_file['uuid'],
+                    save_if_changed,
+                    self.current_file['uuid'],
+                    area.input.toPlainText(),
+                    area.written,
+                    current_date,
+                    callback=self.file_written,
+                    errback=lambda error, area=area: self.file_not_written(
+                        area, error
+                    ),
+                )
+                area.mark_saved()
+                area.saved_in_full(request.future)
+                self.noteModified.emit(self.current_file['uuid'])
+
+    def journal_not_written(self, area, written, error):
+        # the journal is missing those edits now, so the next save
+        # writes the whole note instead
+        if written.exception() is not None:
+            area.journal_failed = True
+        self.file_not_written(area, error)
+
+    def file_written(self, note):
+        if note:
+            self.update_bottom_bar("action", f"Saved {note['edited']}")
+
+    def file_not_written(self, area, error):
+        try:
+            area.input.document().setModified(True)
+        except RuntimeError:
+            # the note has been closed since
+            pass
+        self.update_bottom_bar("action", f"Couldn't save: {error}")
 
     def loadNote(self, uuid):
         if self.note_container:
+            self.note_container.close_note()
             self.main_layout.removeWidget(self.note_container)
             self.note_container.deleteLater()
+            self.note_container = None
 
         settings = file_management.get_config()
-        notes = file_management.get_notes_in_config()
-        for note in notes:
-            if note["uuid"] == uuid:
-
-                self.current_file_path = f"{settings['base_path']}{note['file']}"
-                self.current_file = note
-
-                self.note_container = NoteArea(settings, uuid)
-                self.note_container.updateBottomBar.connect(self.update_bottom_bar)
-                self.note_container.saved.connect(self.write_file)
-
-                if note['type'] != "plain":
-                    self.note_container.swap_plaintext_markdown()
-                    self.note_container.input.setText(
-                        self.note_container.input.toPlainText()
-                    )
-
-                self.main_layout.addWidget(self.note_container)
-
-                self.update_bottom_bar("file", f"{note['file']}")
-                dir = settings["base_path"].split("/")[-2]
-                self.update_bottom_bar("directory", f"{dir}")
-                self.update_bottom_bar(
-                    "action",
-                    f"Last Change {
-                    QDateTime(*[int(dt) for dt in note['edited'].split("-")]).toString()
-                }",
-                )
-                self.update_bottom_bar("cursor", "11")
+        if note := file_management.get_note_by_uuid(uuid):
+
+            self.current_file_path = file_management.get_file_path(note['file'])
+            self.current_file = note
+
+            self.note_container = NoteArea(settings, uuid)
+            self.note_container.updateBottomBar.connect(self.update_bottom_bar)
+            self.note_container.saved.connect(self.write_file)
+            self.note_container.loaded.connect(self.note_loaded)
+
+            # the viewer follows the editor, so it fills in once the text loads
+            if note['type'] != "plain":
+                self.note_container.swap_plaintext_markdown()
+
+            self.main_layout.addWidget(self.note_container)
+
+            self.update_bottom_bar("file", f"{note['file']}")
+            dir = settings["base_path"].split("/")[-2]
+            self.update_bottom_bar("directory", f"{dir}")
+            self.update_bottom_bar(
+                "action",
+                f"Last Change {
+                QDateTime(*[int(dt) for dt in note['edited'].split("-")]).toString()
+            }",
+            )
+            self.update_bottom_bar("cursor", "11")
 
         # reposition the bottom bar to be actually at the bottom
         self.main_layout.removeWidget(self.bottom_bar)
         self.main_layout.addWidget(self.bottom_bar)
 
+    def note_loaded(self):
+        if self.note_container.recovered:
+            self.update_bottom_bar("action", "Recovered unsaved changes")
+
     def update_bottom_bar(self, name, value):
         match name:
             case "cursor":
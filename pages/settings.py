@@ -2,6 +2,10 @@ from PySide6.QtCore import *
 from PySide6.QtGui import *
 from PySide6.QtWidgets import *
 from other import file_management
+from other.autosave import DEFAULT_DELAY
+from other.icons import get_icon
+from other.population import DEFAULT_BATCH_SIZE
+from other import theme
 
 
 class Settings(QScrollArea):
@@ -72,6 +76,50 @@ class Settings(QScrollArea):
         self.rel_ln_gb.add_widget(self.rel_label)
         self.main_layout.addWidget(self.rel_ln_gb)
 
+        self.autosave_gb = GroupBox("Autosave Delay")
+        self.autosave_description = QLabel(
+            "Seconds without typing before the note saves itself. 0 turns autosave off."
+        )
+        self.autosave_edit = QSpinBox(
+            self.autosave_gb,
+            minimum=0,
+            maximum=600,
+            value=self.settings["settings"].get("autosave_delay", DEFAULT_DELAY),
+        )
+
+        self.autosave_gb.add_widget(self.autosave_edit)
+        self.autosave_gb.add_widget(self.autosave_description)
+        self.main_layout.addWidget(self.autosave_gb)
+
+        self.journal_gb = GroupBox("Journaled Saves")
+        self.journal_label = QLabel(
+            "Saves only append the changes to a journal, instead of rewriting the whole note."
+        )
+        self.journal_on = CheckBox(
+            self.settings["settings"].get("journal_saves", False)
+        )
+
+        self.journal_gb.add_widget(self.journal_on)
+        self.journal_gb.add_widget(self.journal_label)
+        self.main_layout.addWidget(self.journal_gb)
+
+        self.batch_gb = GroupBox("Preview Batch Size")
+        self.batch_description = QLabel(
+            "How many note previews the home page loads at a time in the background."
+        )
+        self.batch_edit = QSpinBox(
+            self.batch_gb,
+            minimum=1,
+            maximum=1000,
+            value=self.settings["settings"].get(
+                "preview_batch_size", DEFAULT_BATCH_SIZE
+            ),
+        )
+
+        self.batch_gb.add_widget(self.batch_edit)
+        self.batch_gb.add_widget(self.batch_description)
+        self.main_layout.addWidget(self.batch_gb)
+
         # keep at bottom
         self.save_button = SaveButton("Save", self)
         self.save_button.clicked.connect(self.save_values)
@@ -81,14 +129,18 @@ class Settings(QScrollArea):
 
     def save_values(self):
         data = file_management.get_config()
-        data["settings"] = self.get_dictionary()
+        # keep any settings that don't have a widget here
+        data["settings"].update(self.get_dictionary())
         file_management.write_json(data)
 
     def get_dictionary(self):
         return {
             "save_on_file_exit": self.file_check.isChecked(),
             "font_size": self.font_size_edit.value(),
-            "relative_line_numbers": self.rel_on.isChecked()
+            "relative_line_numbers": self.rel_on.isChecked(),
+            "journal_saves": self.journal_on.isChecked(),
+            "autosave_delay": self.autosave_edit.value(),
+            "preview_batch_size": self.batch_edit.value(),
         }
 
 
@@ -98,27 +150,7 @@ class SaveButton(QPushButton):
 
         self.setCursor(Qt.CursorShape.PointingHandCursor)
         self.setFixedSize(100, 50)
-        self.change_ss("#303030")
-
-    def change_ss(self, color):
-        self.setStyleSheet(
-            f"""
-            QPushButton{{
-                border: 1px solid white;
-                background-color: {color};
-                color: white;
-                border-radius: 10px;
-            }}
-            """
-        )
-
-    def enterEvent(self, event: QEnterEvent, /) -> None:
-        self.change_ss("#404040")
-        return super().enterEvent(event)
-
-    def leaveEvent(self, event: QEvent, /) -> None:
-        self.change_ss("#303030")
-        return super().leaveEvent(event)
+        self.setStyleSheet(theme.SAVE_BUTTON)
 
 
 class GroupBox(QGroupBox):
@@ -164,8 +196,8 @@ class CheckBox(QPushButton):
             """
         )
 
-        self.unchecked = QIcon("/home/zach/Desktop/icons/light_check_box_outline.svg")
-        self.checked = QIcon("/home/zach/Desktop/icons/light_check_box.svg")
+        self.unchecked = get_icon("light_check_box_outline")
+        self.checked = get_icon("light_check_box")
 
         if checked_by_default:
             self.setIcon(self.checked)
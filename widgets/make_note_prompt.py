@@ -3,6 +3,7 @@ from PySide6.QtGui import *
 from PySide6.QtWidgets import *
 import datetime
 from uuid import uuid4
+from other import theme
 
 
 class MakeNotePrompt(QFrame):
@@ -184,23 +185,5 @@ class MakeNotePrompt(QFrame):
                 QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding
             )
 
-            self.set_stylesheet("303030")
+            self.setStyleSheet(theme.PROMPT_BUTTON)
             self.setText(txt)
-
-        def set_stylesheet(self, color):
-            self.setStyleSheet(
-                f"""
-                QPushButton{{
-                    background-color: #{color};
-                    color: white;
-                }}
-                """
-            )
-
-        def enterEvent(self, event: QEnterEvent, /) -> None:
-            self.set_stylesheet("353535")
-            return super().enterEvent(event)
-
-        def leaveEvent(self, event: QEvent, /) -> None:
-            self.set_stylesheet("303030")
-            return super().leaveEvent(event)
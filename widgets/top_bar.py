@@ -2,6 +2,8 @@ from types import FunctionType
 from PySide6.QtCore import *
 from PySide6.QtGui import *
 from PySide6.QtWidgets import *
+from other.icons import get_icon_from_file
+from other import theme
 
 class TopBar(QFrame):
     def __init__(self, *args, **kwargs):
@@ -73,7 +75,7 @@ class TopBar(QFrame):
         """
         same thing as add_button, but uses a path instead of a qicon
         """
-        button = self.IconButton(QIcon(icon_path))
+        button = self.IconButton(get_icon_from_file(icon_path))
         button.clicked.connect(cb)
         self.widgets.append([name, button, cb])
         self.main_layout.addWidget(button)
@@ -100,11 +102,4 @@ class TopBar(QFrame):
             self.setFixedSize(63, 63)
             self.setIcon(ico)
             self.setIconSize(QSize(32, 32))
-
-        def enterEvent(self, event: QEnterEvent, /) -> None:
-            self.setStyleSheet("background-color: #404040;")
-            return super().enterEvent(event)
-
-        def leaveEvent(self, event: QEvent, /) -> None:
-            self.setStyleSheet("background-color: #303030;")
-            return super().leaveEvent(event)
+            self.setStyleSheet(theme.ICON_BUTTON)